@@ -1,3 +1,4 @@
+import asyncio
 from langchain_upstage import ChatUpstage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -5,42 +6,36 @@ from app.utils.llm import get_solar_model
 
 
 class BaseAgent:
-    def __init__(self, name, role, retriever, category):
+    # 공유 검색 캐시가 있으면 공통(DART) 지식은 토론당 한 번만 검색해 모든 에이전트가 같은 결과를 씁니다.
+    # 한 번의 검색으로 세 전공(재무/뉴스/차트)에 필요한 공시 내용을 함께 담도록 k를 늘립니다.
+    SHARED_COMMON_K = 6
+
+    def __init__(self, name, role, retriever, category, retrieval_cache=None):
         self.name = name
         self.role = role
         self.retriever = retriever # get_vector_db(ticker)로 반환된 Chroma 객체
-        self.llm = get_solar_model() # 업스테이지의 최신 모델 사용
+        self.retrieval_cache = retrieval_cache # 토론 단위로 모든 에이전트가 공유하는 검색 캐시 (없으면 직접 검색)
+        self.llm = get_solar_model() # 업스테이지의 최신 모델 사용 (공유 인스턴스)
         self.parser = StrOutputParser()
         self.category = category        # 본인의 전공 카테고리 (news, chart, finance 등)
 
         self.context_cache = {}
 
-    def _get_context(self, query, category=None, debug=False):
-        """
-        특정 카테고리에 대한 지식을 벡터 DB에서 가져옵니다. (캐시 적용)
-        """
-
-        # 1. 캐시 확인: 해당 카테고리의 지식을 이미 가져왔다면 검색 생략
-        if category in self.context_cache:
-            return self.context_cache[category]
-
-        # 1. 카테고리 필터 설정
+    def _search_filter(self, category):
+        # 1. 카테고리 필터 설정 및 k값 결정
         search_filter = {"category": category} if category else None
 
         # # k값은 데이터의 중요도에 따라 조정 가능 (DART는 조금 더 많이 가져옴)
         k_value = 4 if category == "common" else 3
+        if category == "common" and self.retrieval_cache is not None:
+            k_value = self.SHARED_COMMON_K
+        return search_filter, k_value
 
-        # 2. 벡터 DB 검색 (similarity_search 사용)
-        docs = self.retriever.similarity_search(
-            query, 
-            k=k_value, 
-            filter=search_filter
-        )
-
+    def _store_context(self, query, category, docs, debug=False):
         # 3. 캐시에 저장
         context_str = "\n\n".join([doc.page_content for doc in docs])
         self.context_cache[category] = context_str
-        
+
         # [디버그] 검색된 정보 확인 (기존 로직 유지)
         if debug:
             print(f"\n🔍 [{self.name}] RAG 검색 수행 (Category: {category})")
@@ -54,18 +49,45 @@ class BaseAgent:
 
         return context_str
 
-    def _get_dual_context(self, query, debug=False):
+    def _get_context(self, query, category=None, debug=False):
         """
-        [이중 검색 핵심 로직]
-        1. 'common'(DART)에서 공식적인 기업 기본 정보를 가져옵니다.
-        2. 'self.category'(전공)에서 에이전트 특화 실시간 데이터를 가져옵니다.
+        특정 카테고리에 대한 지식을 벡터 DB에서 가져옵니다. (캐시 적용)
         """
-        # 1. 공통 지식 확보 (DART)
-        common_context = self._get_context(query, category="common", debug=debug)
-        
-        # 2. 전공 지식 확보 (news, chart, finance 중 하나)
-        special_context = self._get_context(query, category=self.category, debug=debug)
 
+        # 1. 캐시 확인: 해당 카테고리의 지식을 이미 가져왔다면 검색 생략
+        if category in self.context_cache:
+            return self.context_cache[category]
+
+        search_filter, k_value = self._search_filter(category)
+
+        # 2. 벡터 DB 검색 (similarity_search 사용, 공유 캐시가 있으면 캐시 경유)
+        if self.retrieval_cache is not None:
+            docs = self.retrieval_cache.search(query, category, k_value, search_filter)
+        else:
+            docs = self.retriever.similarity_search(
+                query,
+                k=k_value,
+                filter=search_filter
+            )
+        return self._store_context(query, category, docs, debug=debug)
+
+    async def _aget_context(self, query, category=None, debug=False):
+        """_get_context의 비동기 버전"""
+        if category in self.context_cache:
+            return self.context_cache[category]
+
+        search_filter, k_value = self._search_filter(category)
+        if self.retrieval_cache is not None:
+            docs = await self.retrieval_cache.asearch(query, category, k_value, search_filter)
+        else:
+            docs = await self.retriever.asimilarity_search(
+                query,
+                k=k_value,
+                filter=search_filter
+            )
+        return self._store_context(query, category, docs, debug=debug)
+
+    def _combine_context(self, common_context, special_context):
         # 3. 두 정보를 구조화하여 결합
         combined_context = f"""
 ### [1. 공식 보고서 기반 기초 데이터 (DART)]
@@ -76,26 +98,90 @@ class BaseAgent:
 """
         return combined_context
 
+    def _get_dual_context(self, query, common_query=None, debug=False):
+        """
+        [이중 검색 핵심 로직]
+        1. 'common'(DART)에서 공식적인 기업 기본 정보를 가져옵니다. (common_query가 있으면 그 쿼리로 검색)
+        2. 'self.category'(전공)에서 에이전트 특화 실시간 데이터를 가져옵니다.
+        """
+        # 1. 공통 지식 확보 (DART)
+        common_context = self._get_context(common_query or query, category="common", debug=debug)
+
+        # 2. 전공 지식 확보 (news, chart, finance 중 하나)
+        special_context = self._get_context(query, category=self.category, debug=debug)
+
+        return self._combine_context(common_context, special_context)
+
+    async def _aget_dual_context(self, query, common_query=None, debug=False):
+        """_get_dual_context의 비동기 버전 (공통/전공 검색을 동시에 수행)"""
+        common_context, special_context = await asyncio.gather(
+            self._aget_context(common_query or query, category="common", debug=debug),
+            self._aget_context(query, category=self.category, debug=debug),
+        )
+        return self._combine_context(common_context, special_context)
+
+    def retrieval_requests(self, company_name, ticker):
+        """
+        analyze에 필요한 검색 목록 [(쿼리, 카테고리, k, 필터), ...]
+        공유 검색 캐시가 여러 에이전트의 검색을 모아 한 번에 임베딩할 때 사용합니다.
+        """
+        requests = []
+        for category, query in (("common", self._common_query(company_name, ticker)),
+                                (self.category, self._search_query(company_name, ticker))):
+            if category not in self.context_cache:
+                search_filter, k_value = self._search_filter(category)
+                requests.append((query, category, k_value, search_filter))
+        return requests
+
     def create_prompt(self, context, query):
         """자식 클래스에서 구현할 프롬프트 생성 추상 메서드"""
         raise NotImplementedError("자식 클래스에서 create_prompt를 구현해야 합니다.")
 
+    def _search_query(self, company_name, ticker):
+        """RAG 검색 쿼리 (자식 클래스에서 전공에 맞게 재정의)"""
+        return f"{company_name} {ticker} 재무 실적 현황 이슈 분석"
+
+    def _common_query(self, company_name, ticker):
+        """
+        공통(DART) 지식 검색 쿼리.
+        공유 검색 캐시가 있으면 세 전공을 모두 담는 하나의 쿼리를 써서, 모든 에이전트가 같은 검색 결과를 공유합니다.
+        없으면 기존처럼 전공 쿼리로 검색합니다.
+        """
+        if self.retrieval_cache is None:
+            return self._search_query(company_name, ticker)
+        return f"{company_name} {ticker} 사업 개요 재무 실적 영업이익 주요 이슈 시장 전망 주가"
+
+    def _build_messages(self, company_name, ticker, context, debate_context=None):
+        """검색된 지식과 토론 맥락으로 LLM 입력을 구성합니다. (자식 클래스에서 재정의)"""
+        query_text = f"{company_name}({ticker})에 대한 분석을 수행하세요."
+        if debate_context:
+            query_text += f"\n\n[이전 토론 맥락]\n{debate_context}"
+
+        return self.create_prompt(context, query_text)
 
     def analyze(self, company_name, ticker, debate_context=None, debug=False):
         """
         에이전트가 이중 검색된 지식을 바탕으로 분석을 수행합니다.
         """
         # 1. 이중 검색 수행
-        search_query = f"{company_name} {ticker} 재무 실적 현황 이슈 분석"
-        context = self._get_dual_context(search_query, debug=debug)
+        context = self._get_dual_context(
+            self._search_query(company_name, ticker), self._common_query(company_name, ticker), debug=debug
+        )
 
         # 2. 프롬프트 생성 (토론 맥락이 있다면 포함)
-        query_text = f"{company_name}({ticker})에 대한 분석을 수행하세요."
-        if debate_context:
-            query_text += f"\n\n[이전 토론 맥락]\n{debate_context}"
+        messages = self._build_messages(company_name, ticker, context, debate_context)
 
-        prompt = self.create_prompt(context, query_text)
-        
         # 3. LLM 호출
-        response = self.llm.invoke(prompt)
-        return response.content
\ No newline at end of file
+        response = self.llm.invoke(messages)
+        return response.content
+
+    async def aanalyze(self, company_name, ticker, debate_context=None, debug=False):
+        """
+        analyze의 비동기 버전. ainvoke를 사용하므로 호출 중에 스레드를 점유하지 않습니다.
+        """
+        context = await self._aget_dual_context(
+            self._search_query(company_name, ticker), self._common_query(company_name, ticker), debug=debug
+        )
+        messages = self._build_messages(company_name, ticker, context, debate_context)
+        response = await self.llm.ainvoke(messages)
+        return response.content
@@ -2,15 +2,15 @@ from app.utils.llm import get_solar_model
 from app.agents.base_agent import BaseAgent
 
 class ChartAgent(BaseAgent):
-    def __init__(self, name, role, retriever):
-        super().__init__(name, role, retriever, category= "chart")
+    def __init__(self, name, role, retriever, retrieval_cache=None):
+        super().__init__(name, role, retriever, category="chart", retrieval_cache=retrieval_cache)
 
-    def analyze(self, company_name, ticker, debate_context=None, debug=False):
-        # 1. RAG 검색: 리포트 내의 가격 지표 및 기술적 코멘트 추출
-        query = f"{company_name} {ticker} 목표주가 적정주가 지지선 저항선 거래량 추세 분석"
-        
-        
-        chart_data = self._get_dual_context(query, debug=debug)
+    def _search_query(self, company_name, ticker):
+        # RAG 검색: 리포트 내의 가격 지표 및 기술적 코멘트 추출
+        return f"{company_name} {ticker} 목표주가 적정주가 지지선 저항선 거래량 추세 분석"
+
+    def _build_messages(self, company_name, ticker, chart_data, debate_context=None):
+        # chart_data: 부모의 _get_dual_context로 이중 검색된 지식 (analyze/aanalyze에서 주입)
 
         # 1. 기조 발언
         keynote_format = """
@@ -80,7 +80,7 @@ class ChartAgent(BaseAgent):
             user_msg = f"{company_name}({ticker}) 분석 데이터: {chart_data}"
         
         messages = [("system", system_msg), ("user", user_msg)]
-        return self.llm.invoke(messages).content
+        return messages
 
 
 
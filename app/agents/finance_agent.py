@@ -3,14 +3,15 @@ from app.agents.base_agent import BaseAgent
 
 
 class FinanceAgent(BaseAgent):
-    def __init__(self, name, role, retriever):
-        super().__init__(name, role, retriever, category="finance")
+    def __init__(self, name, role, retriever, retrieval_cache=None):
+        super().__init__(name, role, retriever, category="finance", retrieval_cache=retrieval_cache)
 
-    def analyze(self, company_name, ticker, debate_context=None, debug=False):
-        # 1. RAG를 통해 PDF에서 재무 데이터 추출 (공식 보고서 필터링)
-        # 질문 내용에 따라 유동적으로 검색 Query 생성
-        query = f"{company_name} {ticker} 재무제표 영업이익 부채비율 가치평가"
-        finance_data = self._get_dual_context(query, debug=debug) 
+    def _search_query(self, company_name, ticker):
+        # RAG를 통해 PDF에서 재무 데이터 추출 (공식 보고서 필터링)
+        return f"{company_name} {ticker} 재무제표 영업이익 부채비율 가치평가"
+
+    def _build_messages(self, company_name, ticker, finance_data, debate_context=None):
+        # finance_data: 부모의 _get_dual_context로 이중 검색된 지식 (analyze/aanalyze에서 주입)
 
         # 1. 기조 발언 형식
         keynote_format = """
@@ -81,8 +82,8 @@ class FinanceAgent(BaseAgent):
 
             {keynote_format}"""
             user_msg = f"{company_name}({ticker}) 재무 데이터: {finance_data}"
-        # Upstage Solar-Pro2를 사용하여 추론 실행
-        return self.llm.invoke([("system", system_msg), ("user", user_msg)]).content
+        # Upstage Solar-Pro2에 전달할 메시지 (실제 호출은 BaseAgent.analyze / aanalyze)
+        return [("system", system_msg), ("user", user_msg)]
 
 
 
@@ -8,11 +8,8 @@ class JudgeAgent:
             self.llm = llm
             print("⚠️ Judge Agent: 기본 LLM 모드로 실행됩니다.")
 
-    def adjudicate(self, company_name, full_history):
-        """
-        [Task 3] 최종 투자 전략 수립
-        """
-        prompt = f"""
+    def _build_prompt(self, company_name, full_history):
+        return f"""
         임의로 이모티콘을 사용하지 마시오.
 
         여러 전문가의 토론 내용을 종합하여 현재 시점에서 가장 합리적인 판단을 내리는 최종 의사결정권자(Judge)입니다.
@@ -65,4 +62,13 @@ class JudgeAgent:
 
         결과는 가독성 좋은 Markdown 형식으로 출력하세요.
         """
-        return self.llm.invoke(prompt).content
\ No newline at end of file
+
+    def adjudicate(self, company_name, full_history):
+        """
+        [Task 3] 최종 투자 전략 수립
+        """
+        return self.llm.invoke(self._build_prompt(company_name, full_history)).content
+
+    async def aadjudicate(self, company_name, full_history):
+        response = await self.llm.ainvoke(self._build_prompt(company_name, full_history))
+        return response.content
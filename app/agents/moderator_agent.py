@@ -2,6 +2,8 @@ import re
 
 class ModeratorAgent:
     def __init__(self, llm):
+        # 기록 압축처럼 깊은 추론이 필요 없는 작업용 기본 LLM
+        self.base_llm = llm
         try:
             self.llm = llm.bind(reasoning_effort="high")
             print(f"✅ Moderator Reasoning Mode 설정됨: {self.llm.kwargs}") 
@@ -9,8 +11,8 @@ class ModeratorAgent:
             self.llm = llm 
             print("Moderator: 기본 LLM 모드로 실행됩니다.")
             
-    def facilitate(self, company_name, history):
-        prompt = f"""
+    def _facilitate_prompt(self, company_name, history):
+        return f"""
         임의로 이모티콘을 사용하지 마시오.
 
         당신은 주식 토론의 사회자입니다.
@@ -40,13 +42,58 @@ class ModeratorAgent:
         ---
 
         """
-        return self.llm.invoke(prompt).content
 
-    def summarize_debate(self, company_name, history):
-        """
-        [Task 4] 사회자의 중립적 요약 (판단 X, 정리 O)
+    def _facilitate_multi_prompt(self, company_name, history):
+        """한 라운드에 여러 전문가를 동시에 지목하는 병렬 진행용 프롬프트"""
+        return f"""
+        임의로 이모티콘을 사용하지 마시오.
+
+        당신은 주식 토론의 사회자입니다.
+        현재까지의 기록을 보고 토론을 계속할지, 아니면 결론이 났는지 판단하십시오.
+        이번 라운드에서는 반박이 필요한 전문가를 **여러 명 동시에** 지목할 수 있습니다.
+
+        [분석 대상]: {company_name}
+        [토론 기록]:
+        {history}
+
+        [사회자의 사고 과정]
+        1. **THOUGHT**: 현재 차트, 뉴스, 재무 전문가들의 의견이 하나로 수렴되었는가? 아니면 여전히 쟁점이 있어 더 싸워야 하는가?
+        2. **STATUS**: 
+           - 의견이 수렴되었거나, 정해진 시간이 지났다면 -> [TERMINATE]
+           - 여전히 쟁점이 있어 토론이 더 필요하다면 -> [CONTINUE]
+        3. **NEXT_SPEAKERS**: [CONTINUE]일 경우, 이번 라운드에 답할 발언자를 Chart, News, Finance 중에서 1명 이상 쉼표로 지목.
+        4. **INSTRUCTION_<발언자>**:
+            - 지목한 발언자마다 한 줄씩, 서로 다른 구체적인 반박 질문을 작성하시오.
+            - 질문을 시작할 때는 반드시 대상을 명시적으로 호칭하시오. (예시: "차트 분석가님, 질문...")
+
+        반드시 아래 포맷으로 답변하세요:
+
+        THOUGHT: (상황 판단 내용)
+        STATUS: [TERMINATE] 또는 [CONTINUE]
+        NEXT_SPEAKERS: [Chart, News, Finance 중 1명 이상]
+        INSTRUCTION_Chart: (차트 분석가에게 할 질문, 지목한 경우만)
+        INSTRUCTION_News: (뉴스 분석가에게 할 질문, 지목한 경우만)
+        INSTRUCTION_Finance: (재무 분석가에게 할 질문, 지목한 경우만)
+
+        ---
+
         """
-        prompt = f"""
+
+    def _select_prompt(self, company_name, history, multi):
+        if multi:
+            return self._facilitate_multi_prompt(company_name, history)
+        return self._facilitate_prompt(company_name, history)
+
+    def facilitate(self, company_name, history, multi=False):
+        return self.llm.invoke(self._select_prompt(company_name, history, multi)).content
+
+    async def afacilitate(self, company_name, history, multi=False):
+        """multi=True면 한 라운드에 여러 전문가를 지목하는 포맷으로 응답합니다."""
+        response = await self.llm.ainvoke(self._select_prompt(company_name, history, multi))
+        return response.content
+
+    def _summary_prompt(self, company_name, history):
+        return f"""
         임의로 이모티콘을 사용하지 마시오.
 
         당신은 주식 토론의 사회자입니다. 치열했던 토론이 이제 막 끝났습니다.
@@ -63,4 +110,38 @@ class ModeratorAgent:
         2. 각 전문가(차트, 뉴스, 재무)가 어떤 핵심 주장을 펼쳤는지 한 줄씩 정리하세요.
         3. 서로 충돌했던 핵심 쟁점(Conflict)이 무엇이었는지 언급하세요.
         """
-        return self.llm.invoke(prompt).content
+
+    def summarize_debate(self, company_name, history):
+        """
+        [Task 4] 사회자의 중립적 요약 (판단 X, 정리 O)
+        """
+        return self.llm.invoke(self._summary_prompt(company_name, history)).content
+
+    async def asummarize_debate(self, company_name, history):
+        response = await self.llm.ainvoke(self._summary_prompt(company_name, history))
+        return response.content
+
+    def _condense_prompt(self, company_name, previous_summary, new_history):
+        return f"""
+        임의로 이모티콘을 사용하지 마시오.
+
+        당신은 주식 토론의 서기입니다. 토론이 길어져 오래된 발언을 요약본으로 대체하려 합니다.
+        [기존 요약]에 [새로 추가할 발언]의 내용을 반영하여 하나의 갱신된 요약을 작성하세요.
+
+        [분석 대상]: {company_name}
+        [기존 요약]:
+        {previous_summary or "(없음)"}
+
+        [새로 추가할 발언]:
+        {new_history}
+
+        [작성 가이드]
+        1. 발언자(차트, 뉴스, 재무, 사회자)별 핵심 주장과 근거 수치를 보존하세요.
+        2. 아직 해결되지 않은 쟁점과 사회자의 지시는 빠뜨리지 마세요.
+        3. 평가나 새로운 의견을 덧붙이지 말고, 간결한 개조식으로 작성하세요.
+        """
+
+    async def acondense_history(self, company_name, previous_summary, new_history):
+        """오래된 토론 기록을 기존 요약에 누적해 압축합니다. (롤링 토론 맥락용)"""
+        response = await self.base_llm.ainvoke(self._condense_prompt(company_name, previous_summary, new_history))
+        return response.content
@@ -2,17 +2,16 @@ from app.utils.llm import get_solar_model
 from app.agents.base_agent import BaseAgent
 
 class NewsAgent(BaseAgent):
-    def __init__(self, name, role, retriever):
-        super().__init__(name, role, retriever, category="news")
+    def __init__(self, name, role, retriever, retrieval_cache=None):
+        super().__init__(name, role, retriever, category="news", retrieval_cache=retrieval_cache)
 
 
-    # [수정] debug=False 인자를 추가합니다.
-    def analyze(self, company_name, ticker, debate_context=None, debug=False):
-        # 1. RAG 검색: 리포트에서 최신 이슈 및 심리 관련 내용 추출
-        query = f"{company_name} {ticker} 최신 이슈 신제품 시장 점유율 투자 심리 호재 악재"
-        
-        # [수정] _get_context 대신 부모의 _get_dual_context를 호출하고 debug 값을 넘겨줍니다.
-        news_data = self._get_dual_context(query, debug=debug)
+    def _search_query(self, company_name, ticker):
+        # RAG 검색: 리포트에서 최신 이슈 및 심리 관련 내용 추출
+        return f"{company_name} {ticker} 최신 이슈 신제품 시장 점유율 투자 심리 호재 악재"
+
+    def _build_messages(self, company_name, ticker, news_data, debate_context=None):
+        # news_data: 부모의 _get_dual_context로 이중 검색된 지식 (analyze/aanalyze에서 주입)
 
         # 1. 기조 발언 형식
         keynote_format = """
@@ -83,7 +82,7 @@ class NewsAgent(BaseAgent):
             {keynote_format}"""
             user_msg = f"{company_name}({ticker}) 분석 시작."
 
-        return self.llm.invoke([("system", system_msg), ("user", user_msg)]).content
+        return [("system", system_msg), ("user", user_msg)]
 
 
 
@@ -6,7 +6,7 @@ class InsightReportAgent:
         self.llm = llm
 
 
-    def generate_report(self, company_name, ticker, full_history):
+    def _build_prompt(self, company_name, ticker, full_history):
         # 1. 마크다운의 깊이를 모두 담은 고도화된 JSON 스키마
         report_schema = {
             "report_info": { "title": f"{company_name} 인사이트 리포트", "symbol": ticker, "date": "2026-01" },
@@ -68,12 +68,18 @@ class InsightReportAgent:
         [토론 기록]:
         {full_history}
         """
-        
+        return prompt
+
+    def generate_report(self, company_name, ticker, full_history):
         # LLM 호출
-        raw_content = self.llm.invoke(prompt).content
+        raw_content = self.llm.invoke(self._build_prompt(company_name, ticker, full_history)).content
 
         # 2단계: 정제 및 유효성 검사 호출
         return self.validate_json(raw_content)
+
+    async def agenerate_report(self, company_name, ticker, full_history):
+        response = await self.llm.ainvoke(self._build_prompt(company_name, ticker, full_history))
+        return self.validate_json(response.content)
     
 
     def validate_json(self, json_string):
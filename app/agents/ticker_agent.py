@@ -1,16 +1,12 @@
 from app.utils.llm import get_solar_model
+from app.utils.query_cache import QueryCache
+from app.utils.ticker_utils import normalize_query
 from langchain_core.messages import HumanMessage, SystemMessage
+import asyncio
+import os
 import re
 
-def extract_company_name(user_query: str):
-    """
-    사용자의 질문에서 공식 주식 종목명을 추출합니다.
-    """
-    # 1. Solar 모델 로드 
-    llm = get_solar_model()
-
-    # 2. 시스템 프롬프트 설정
-    system_prompt = """
+SYSTEM_PROMPT = """
     당신은 글로벌 주식 전문 비서입니다. 사용자의 질문에서 분석 대상의 **'티커(Ticker)'**만 추출하세요.
 
     [추출 규칙 - 엄격 준수]
@@ -21,29 +17,82 @@ def extract_company_name(user_query: str):
     5. **결과값 외에 (설명, 추론 과정(Thought), '정답:') 같은 수식어를 절대 붙이지 마세요.** 단 한 단어만 출력하세요.
     6. 어떤 정보도 찾지 못했다면 'NONE'만 출력하세요.
     """
-    
-    # 3. 메시지 구성
-    messages = [
-        SystemMessage(content=system_prompt),
+
+
+# 같은 뜻의 질문('카카오 어때?' / '카카오 어때')은 LLM을 다시 호출하지 않고 이전 추출 결과를 씁니다.
+extraction_cache = QueryCache(
+    path=os.getenv("TICKER_EXTRACTION_CACHE_PATH", "ticker_extraction_cache.db"),
+    ttl_seconds=int(os.getenv("TICKER_EXTRACTION_TTL", 7 * 24 * 60 * 60)),
+    max_entries=int(os.getenv("TICKER_EXTRACTION_MAX_ENTRIES", 10000)),
+)
+
+
+def _remember(key: str, result: str):
+    # 'NONE'은 API 오류일 수도 있으므로 저장하지 않습니다.
+    if key and result and result != "NONE":
+        extraction_cache.set(key, result)
+    return result
+
+
+def _build_messages(user_query: str):
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=f"사용자 질문: {user_query}")
     ]
+
+
+def _parse_response(response: str):
+    response = response.strip()
+
+    match = re.search(r'(?:정답|티커|Ticker):\s*([A-Z0-9.]+)', response, re.I)
+    if match:
+        return match.group(1).strip()
     
-    # 4. Solar LLM 호출 및 결과 반환
+    # 2. 줄바꿈이 있다면 마지막 줄의 첫 단어를 가져옴 (보통 결론이 마지막에 오므로)
+    lines = [line.strip() for line in response.split('\n') if line.strip()]
+    if lines:
+        last_word = lines[-1].split()[-1] # 마지막 줄의 마지막 단어
+        # 특수문자 제거 (**, [], () 등)
+        return re.sub(r'[^\w.]', '', last_word)
+    return response
+
+
+def extract_company_name(user_query: str):
+    """
+    사용자의 질문에서 공식 주식 종목명을 추출합니다.
+    """
+    # 0. 정규화한 질문으로 캐시 확인
+    key = normalize_query(user_query)
+    cached = extraction_cache.get(key)
+    if cached:
+        return cached
+
+    # 1. Solar 모델 로드 
+    llm = get_solar_model()
+
+    # 2. Solar LLM 호출 및 결과 반환
     try:
-        response = llm.invoke(messages).content.strip()
-        
-        match = re.search(r'(?:정답|티커|Ticker):\s*([A-Z0-9.]+)', response, re.I)
-        if match:
-            return match.group(1).strip()
-        
-        # 2. 줄바꿈이 있다면 마지막 줄의 첫 단어를 가져옴 (보통 결론이 마지막에 오므로)
-        lines = [line.strip() for line in response.split('\n') if line.strip()]
-        if lines:
-            last_word = lines[-1].split()[-1] # 마지막 줄의 마지막 단어
-            # 특수문자 제거 (**, [], () 등)
-            return re.sub(r'[^\w.]', '', last_word)
-        return response
+        return _remember(key, _parse_response(llm.invoke(_build_messages(user_query)).content))
      
     except Exception as e:
         print(f"❌ LLM 종목명 추출 중 오류 발생: {e}")
         return "NONE"
+
+
+async def aextract_company_name(user_query: str):
+    """extract_company_name의 비동기 버전 (이벤트 루프를 막지 않음)"""
+    key = normalize_query(user_query)
+    # 캐시는 SQLite 파일이므로 조회/저장은 스레드에서 수행합니다.
+    cached = await asyncio.to_thread(extraction_cache.get, key)
+    if cached:
+        return cached
+
+    llm = get_solar_model()
+
+    try:
+        response = await llm.ainvoke(_build_messages(user_query))
+        return await asyncio.to_thread(_remember, key, _parse_response(response.content))
+
+    except Exception as e:
+        print(f"❌ LLM 종목명 추출 중 오류 발생: {e}")
+        return "NONE"
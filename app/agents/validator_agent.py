@@ -5,15 +5,12 @@ class DataValidator:
     def __init__(self):
         self.llm = get_solar_model()
 
-    # [수정] ticker 인자 추가, 리턴 타입 변경 (str -> list[Document])
-    def validate_and_filter(self, category: str, company_name: str, ticker: str, raw_data: str) -> list[Document]:
-        """
-        Raw Data를 검증/정제한 후, Ingestor가 바로 쓸 수 있게 Document 객체로 포장하여 반환합니다.
-        """
-        # 데이터가 비어있거나 에러 메시지인 경우 빈 리스트 반환 (또는 '데이터 없음' 문서 반환)
+    def _build_messages(self, category: str, company_name: str, ticker: str, raw_data: str):
+        """검증 프롬프트 구성. 데이터가 비어있거나 에러 메시지면 None을 반환합니다."""
+        # 데이터가 비어있거나 에러 메시지인 경우 None 반환 (호출부에서 빈 리스트로 처리)
         if not raw_data or "오류" in raw_data or "Error" in raw_data:
             print(f"⚠️ [Validator] {category} 데이터 유효하지 않음.")
-            return []  # 빈 리스트 반환하여 DB 저장을 건너뛰거나, 필요시 더미 데이터 반환
+            return None  # 빈 리스트 반환하여 DB 저장을 건너뜀
 
         # 1. 카테고리별 검증 기준 설정
         if category == "news":
@@ -62,25 +59,51 @@ class DataValidator:
             ("system", "당신은 데이터 품질 관리자입니다."),
             ("user", prompt)
         ]
+        return messages
+
+    def _to_documents(self, category: str, company_name: str, ticker: str, cleaned_text: str) -> list[Document]:
+        if "NULL" in cleaned_text:
+            return []
+
+        # [핵심] 여기서 Document 객체로 포장합니다.
+        doc = Document(
+            page_content=cleaned_text,
+            metadata={
+                "source": category,
+                "ticker": ticker,
+                "company": company_name
+            }
+        )
+        return [doc] # 리스트 형태로 반환
+
+    def _fallback_documents(self, category: str, ticker: str, raw_data: str, error) -> list[Document]:
+        print(f"❌ [Validator] 검증 중 에러: {error}")
+        # 에러 시 원본이라도 포장해서 반환 (Fallback)
+        return [Document(page_content=raw_data, metadata={"source": category, "ticker": ticker, "note": "validation_failed"})]
+
+    # [수정] ticker 인자 추가, 리턴 타입 변경 (str -> list[Document])
+    def validate_and_filter(self, category: str, company_name: str, ticker: str, raw_data: str) -> list[Document]:
+        """
+        Raw Data를 검증/정제한 후, Ingestor가 바로 쓸 수 있게 Document 객체로 포장하여 반환합니다.
+        """
+        messages = self._build_messages(category, company_name, ticker, raw_data)
+        if messages is None:
+            return []
 
         try:
             cleaned_text = self.llm.invoke(messages).content
-            
-            if "NULL" in cleaned_text:
-                return []
-
-            # [핵심] 여기서 Document 객체로 포장합니다.
-            doc = Document(
-                page_content=cleaned_text,
-                metadata={
-                    "source": category,
-                    "ticker": ticker,
-                    "company": company_name
-                }
-            )
-            return [doc] # 리스트 형태로 반환
+            return self._to_documents(category, company_name, ticker, cleaned_text)
+        except Exception as e:
+            return self._fallback_documents(category, ticker, raw_data, e)
 
+    async def avalidate_and_filter(self, category: str, company_name: str, ticker: str, raw_data: str) -> list[Document]:
+        """validate_and_filter의 비동기 버전 (ainvoke 사용)"""
+        messages = self._build_messages(category, company_name, ticker, raw_data)
+        if messages is None:
+            return []
+
+        try:
+            response = await self.llm.ainvoke(messages)
+            return self._to_documents(category, company_name, ticker, response.content)
         except Exception as e:
-            print(f"❌ [Validator] 검증 중 에러: {e}")
-            # 에러 시 원본이라도 포장해서 반환 (Fallback)
-            return [Document(page_content=raw_data, metadata={"source": category, "ticker": ticker, "note": "validation_failed"})]
\ No newline at end of file
+            return self._fallback_documents(category, ticker, raw_data, e)
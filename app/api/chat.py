@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.service.stock_service import StockService
@@ -14,4 +15,20 @@ async def chat_with_agent(request: UserRequest):
     return StreamingResponse(
         service.handle_user_task(request.user_question),
         media_type="application/x-ndjson"
-    )
\ No newline at end of file
+    )
+
+@router.get("/debates/{ticker}/replay")
+async def replay_debate(ticker: str, window: Optional[int] = None, max_turns: int = 3):
+    """완료되었거나 진행 중인 토론을 처음부터 최대 속도로 재생합니다. (window 생략 시 현재 시간 창)"""
+    pure_ticker = ticker.split('.')[0]
+    debate_key = service.debate_logs.make_key(pure_ticker, max_turns, window)
+    if service.debate_logs.status(debate_key) is None:
+        raise HTTPException(status_code=404, detail="재생할 토론 기록이 없습니다.")
+    return StreamingResponse(
+        service.replay_debate(pure_ticker, window, max_turns),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/stats")
+async def get_service_stats():
+    return service.get_stats()
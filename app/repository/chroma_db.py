@@ -1,37 +1,120 @@
 # app/repository/chroma_db.py
 
 import os
+import threading
+from collections import OrderedDict
+import chromadb
+from chromadb.config import Settings
 from langchain_chroma import Chroma
-from langchain_upstage import UpstageEmbeddings
 from dotenv import load_dotenv
+from app.utils.llm import get_embedding_model
+from app.repository.embedding_cache import CachedEmbeddings, embedding_cache, query_embedding_cache
 
 load_dotenv()
 
-CHROMA_PATH = "chroma_db"
+# local: 로컬 디스크(chroma_db) / server: 별도 chromadb 서비스(HTTP) / memory: 테스트용 휘발성 저장소
+CHROMA_MODE = os.getenv("CHROMA_MODE", "local").lower()
+CHROMA_PATH = os.getenv("CHROMA_PERSIST_PATH", "chroma_db")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
+EMBEDDING_MODEL = "embedding-query"
+# 메모리에 유지할 종목별 컬렉션 핸들 수 (초과 시 가장 오래 안 쓴 종목부터 제거)
+COLLECTION_CACHE_SIZE = int(os.getenv("CHROMA_COLLECTION_CACHE_SIZE", 64))
+
+_client = None
+_client_lock = threading.Lock()
+_collections = OrderedDict()   # collection_name -> Chroma (LRU 순서)
+_collections_lock = threading.Lock()
+_collection_versions = {}      # collection_name -> 쓰기 횟수 (검색 캐시 무효화용)
+
+
+def _create_client():
+    """CHROMA_MODE에 맞는 chromadb 클라이언트를 생성합니다."""
+    settings = Settings(anonymized_telemetry=False)
+
+    if CHROMA_MODE == "server":
+        # 여러 백엔드 레플리카가 하나의 벡터 저장소를 공유합니다. (keep-alive 커넥션 풀 사용)
+        settings = Settings(
+            anonymized_telemetry=False,
+            chroma_http_keepalive_secs=float(os.getenv("CHROMA_HTTP_KEEPALIVE", 60)),
+            chroma_http_max_connections=int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", 100)),
+            chroma_http_max_keepalive_connections=int(os.getenv("CHROMA_HTTP_MAX_KEEPALIVE", 20)),
+        )
+        client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT, settings=settings)
+        print(f"DB 연결 완료 | 서버: {CHROMA_HOST}:{CHROMA_PORT}")
+    elif CHROMA_MODE == "memory":
+        client = chromadb.EphemeralClient(settings=settings)
+        print("DB 연결 완료 | 메모리 모드 (프로세스 종료 시 삭제)")
+    elif CHROMA_MODE == "local":
+        client = chromadb.PersistentClient(path=CHROMA_PATH, settings=settings)
+        print(f"DB 연결 완료 | 물리 경로: {CHROMA_PATH}")
+    else:
+        raise ValueError(f"지원하지 않는 CHROMA_MODE 입니다: {CHROMA_MODE} (local / server / memory)")
+    return client
+
+
+def get_chroma_client():
+    """프로세스 전체가 공유하는 chromadb 클라이언트 (저장소/커넥션은 한 번만 엽니다)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
 
 def get_vector_db(ticker: str):
     """
-    고정된 물리 경로(chroma_db) 내에서 
+    CHROMA_MODE로 선택된 저장소(로컬 경로 또는 chromadb 서버) 안에서
     종목별 논리 서랍(collection_name)을 생성하여 반환합니다.
+    이미 연 종목은 캐시된 핸들을 그대로 돌려줍니다. (LRU)
     """
-    
-    # 2. 임베딩 모델 설정 (Upstage 모델 사용)
-    # .env에 UPSTAGE_API_KEY가 있어야 합니다.
-    embeddings = UpstageEmbeddings(model="embedding-query")
-    
 
     # Chroma 컬렉션 이름은 반드시 알파벳으로 시작해야 하므로 'ticker_'를 붙여줍니다.
     clean_ticker = ticker.replace('.', '_').upper()
     collection_name = f"ticker_{clean_ticker}"
 
-    # 3. Chroma DB 객체 생성 및 반환
-    # 폴더가 없으면 새로 생성하고, 있으면 기존 데이터를 로드합니다.
-    vector_db = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embeddings,
-        collection_name=collection_name
-    )
-    
-    print(f"DB 연결 완료 | 물리 경로: {CHROMA_PATH} | 컬렉션: {collection_name}")
-
-    return vector_db
\ No newline at end of file
+    with _collections_lock:
+        vector_db = _collections.get(collection_name)
+        if vector_db is not None:
+            _collections.move_to_end(collection_name)
+            return vector_db
+
+        # 2. 임베딩 모델 설정 (Upstage 모델 사용)
+        # .env에 UPSTAGE_API_KEY가 있어야 합니다. (프로세스 공유 인스턴스)
+        # 문서 임베딩은 내용 해시 캐시를 거치므로 바뀌지 않은 조각은 다시 임베딩하지 않습니다.
+        # 검색 쿼리 임베딩도 파일 캐시(LRU)를 거치므로 같은 종목을 다시 분석하면 쿼리 임베딩 호출이 없습니다.
+        embeddings = CachedEmbeddings(
+            get_embedding_model(EMBEDDING_MODEL), embedding_cache, namespace=EMBEDDING_MODEL,
+            query_cache=query_embedding_cache,
+        )
+
+        # 3. Chroma DB 객체 생성 및 반환
+        # 컬렉션이 없으면 새로 생성하고, 있으면 기존 데이터를 로드합니다.
+        vector_db = Chroma(
+            client=get_chroma_client(),
+            embedding_function=embeddings,
+            collection_name=collection_name
+        )
+        _collections[collection_name] = vector_db
+
+        # 자주 쓰지 않는 종목의 핸들은 정리합니다.
+        while len(_collections) > COLLECTION_CACHE_SIZE:
+            evicted, _ = _collections.popitem(last=False)
+            print(f"🧹 컬렉션 핸들 정리: {evicted}")
+
+    print(f"컬렉션 열기 완료 | 컬렉션: {collection_name}")
+
+    return vector_db
+
+
+def collection_version(vector_db):
+    """컬렉션 내용이 바뀔 때마다 증가하는 버전 번호 (이 프로세스에서의 쓰기 기준)"""
+    return _collection_versions.get(vector_db._collection.name, 0)
+
+
+def bump_collection_version(vector_db):
+    """문서를 추가/삭제한 뒤 호출하여, 이전 버전 기준의 검색 캐시를 무효화합니다."""
+    name = vector_db._collection.name
+    with _collections_lock:
+        _collection_versions[name] = _collection_versions.get(name, 0) + 1
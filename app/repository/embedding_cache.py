@@ -0,0 +1,235 @@
+# app/repository/embedding_cache.py
+
+import os
+import asyncio
+import sqlite3
+import hashlib
+import time
+import threading
+from array import array
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from app.utils.llm import embed_queries, aembed_queries
+
+load_dotenv()
+
+
+class EmbeddingCache:
+    """
+    텍스트 내용 해시(sha256) -> 임베딩 벡터를 SQLite 파일에 보관합니다.
+    같은 모델로 같은 문장을 다시 임베딩할 때 API를 호출하지 않기 위한 저장소입니다.
+    벡터는 float32 바이트 배열(BLOB)로 저장합니다.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """찾은 키만 담은 {key: vector} 딕셔너리를 반환합니다."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items):
+        """items: [(key, vector), ...]"""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {"entries": size, "hits": self.hits, "misses": self.misses}
+
+
+class QueryEmbeddingCache:
+    """
+    검색 쿼리 문장 해시 -> 쿼리 임베딩 벡터 캐시 (SQLite 파일이라 여러 워커와 재시작 사이에 공유)
+    에이전트 검색 쿼리는 템플릿이라 같은 종목을 다시 분석하면 같은 문장이 반복됩니다.
+    max_entries를 넘으면 가장 오래 쓰이지 않은 항목부터 지웁니다. (LRU)
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+        self.max_entries = int(max_entries or os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", 5000))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings (last_used)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """찾은 키만 담은 {key: vector} 딕셔너리를 반환하고, 찾은 항목의 최근 사용 시각을 갱신합니다."""
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+        found = {}
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM query_embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE query_embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        """items: [(key, vector), ...]"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            # 용량 초과분 정리 (가장 오래 쓰이지 않은 항목부터)
+            self._conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                " SELECT key FROM query_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            return {"entries": size, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델 앞에 캐시를 두는 래퍼입니다.
+    - 문서 임베딩(embed_documents): EmbeddingCache. 적재(ingest) 시 바뀌지 않은 조각은 저장된 벡터를 재사용합니다.
+    - 검색 쿼리(embed_query / embed_queries): query_cache가 있으면 QueryEmbeddingCache, 없으면 원본 모델에 위임합니다.
+      embed_queries는 캐시에 없는 쿼리만 모아 한 번의 API 호출로 임베딩합니다.
+    """
+
+    def __init__(self, embeddings, cache, namespace, query_cache=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.query_cache = query_cache
+        self.namespace = namespace   # 모델 이름 (모델이 바뀌면 캐시도 분리)
+
+    def _split(self, texts, cache=None):
+        cache = cache or self.cache
+        keys = [EmbeddingCache.make_key(self.namespace, t) for t in texts]
+        found = cache.get_many(keys)
+        # 같은 배치 안의 중복 문장은 한 번만 임베딩합니다.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def _merge(self, keys, found, missing, vectors, cache=None, label="조각"):
+        cache = cache or self.cache
+        new_items = list(zip(missing.keys(), vectors))
+        cache.put_many(new_items)
+        found.update(new_items)
+
+        hits = len(keys) - len(missing)
+        cache.record(hits, len(missing))
+        if hits:
+            print(f"♻️ 임베딩 캐시 적중: {hits}/{len(keys)}개 {label} (API 호출 {len(missing)}건)")
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._split(texts)
+        vectors = self.embeddings.embed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, found, missing, vectors)
+
+    async def aembed_documents(self, texts):
+        # 캐시 조회/저장은 SQLite 파일 I/O이므로 이벤트 루프 밖 스레드에서 수행합니다.
+        keys, found, missing = await asyncio.to_thread(self._split, texts)
+        vectors = await self.embeddings.aembed_documents(list(missing.values())) if missing else []
+        return await asyncio.to_thread(self._merge, keys, found, missing, vectors)
+
+    def embed_query(self, text):
+        if self.query_cache is None:
+            return self.embeddings.embed_query(text)
+        return self.embed_queries([text])[0]
+
+    async def aembed_query(self, text):
+        if self.query_cache is None:
+            return await self.embeddings.aembed_query(text)
+        return (await self.aembed_queries([text]))[0]
+
+    def embed_queries(self, texts):
+        """여러 검색 쿼리를 한 번의 API 호출로 임베딩합니다."""
+        if self.query_cache is None:
+            return embed_queries(self.embeddings, texts)
+        keys, found, missing = self._split(texts, self.query_cache)
+        vectors = embed_queries(self.embeddings, list(missing.values())) if missing else []
+        return self._merge(keys, found, missing, vectors, self.query_cache, label="쿼리")
+
+    async def aembed_queries(self, texts):
+        if self.query_cache is None:
+            return await aembed_queries(self.embeddings, texts)
+        keys, found, missing = await asyncio.to_thread(self._split, texts, self.query_cache)
+        vectors = await aembed_queries(self.embeddings, list(missing.values())) if missing else []
+        return await asyncio.to_thread(
+            self._merge, keys, found, missing, vectors, self.query_cache, label="쿼리"
+        )
+
+
+# 프로세스 전역 임베딩 캐시 (문서 / 검색 쿼리)
+embedding_cache = EmbeddingCache()
+query_embedding_cache = QueryEmbeddingCache()
@@ -1,10 +1,10 @@
 from langchain_openai import ChatOpenAI
-from langchain_upstage import UpstageEmbeddings
+from app.utils.llm import get_embedding_model
 from langchain_community.vectorstores import Chroma
 
 class StockRetriever:
     def __init__(self, db_path="chroma_db/"):
-        self.embeddings = UpstageEmbeddings(model="solar-embedding-1-large")
+        self.embeddings = get_embedding_model("solar-embedding-1-large")
         self.db = Chroma(persist_directory=db_path, embedding_function=self.embeddings)
 
     def search(self, query, source_type=None, k=3):
@@ -49,18 +49,32 @@ class DartCollector:
         return text.strip()
 
 
-    def get_latest_report_text(self, ticker: str, company_name: str) -> list[Document]:
+    def get_latest_filing(self, ticker: str) -> dict:
         """
-        가장 최신의 정기공시(사업, 반기, 분기)를 찾아 주요 섹션 텍스트를 통합하여 반환합니다.
+        최신 정기공시(A)의 식별 정보만 가볍게 조회합니다. (본문 다운로드 X)
+        지식 베이스 신선도 확인 시 rcept_no 비교용으로 사용합니다.
         """
-        # 1. 최신 정기공시 목록 가져오기 (A: 정기공시)
         # 2024년부터 현재까지의 공시 중 가장 최근 것 하나를 선택
         row = self.dart.list(ticker, start='20240101', kind='A').iloc[0]
-        rcept_no = row['rcept_no']
-        report_nm = row['report_nm']
+        return {
+            "rcept_no": row['rcept_no'],
+            "report_nm": row['report_nm'],
+            "corp_name": row['corp_name'],
+        }
+
+    def get_latest_report_text(self, ticker: str, company_name: str, filing: dict = None) -> list[Document]:
+        """
+        가장 최신의 정기공시(사업, 반기, 분기)를 찾아 주요 섹션 텍스트를 통합하여 반환합니다.
+        filing: get_latest_filing()으로 이미 조회한 공시 정보 (있으면 목록 조회 생략)
+        """
+        # 1. 최신 정기공시 목록 가져오기 (A: 정기공시)
+        if filing is None:
+            filing = self.get_latest_filing(ticker)
+        rcept_no = filing['rcept_no']
+        report_nm = filing['report_nm']
         
         # 기업명이 인자로 안 들어왔을 경우 DART 리스트에서 가져온 이름 사용
-        display_name = company_name if company_name else row['corp_name']
+        display_name = company_name if company_name else filing['corp_name']
 
         print(f"📄 {display_name}({ticker}) 분석 보고서 탐색: {report_nm}")
 
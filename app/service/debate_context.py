@@ -0,0 +1,98 @@
+# app/service/debate_context.py
+
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """tiktoken(cl100k_base) 기준 토큰 수. 인코딩 파일을 받을 수 없는 환경에서는 글자 수로 근사합니다."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    print(f"⚠️ tiktoken 인코딩을 불러오지 못해 글자 수로 토큰을 근사합니다: {e}")
+                    _encoding = False
+    if _encoding is False:
+        return len(text) // 2 + 1
+    return len(_encoding.encode(text))
+
+
+class DebateContext:
+    """
+    토론 기록을 LLM 입력용 텍스트로 만드는 롤링 맥락 관리자 (토론 1회당 1개)
+    - 전체 기록이 토큰 예산 안이면 기존처럼 전부 그대로 넣습니다.
+    - 예산을 넘으면 최근 발언(keep_recent개)은 원문으로, 그 이전 발언은 누적 요약으로 넣습니다.
+      요약은 새로 밀려난 발언만 이전 요약에 덧붙여 갱신하므로(증분 요약) 턴마다 전체를 다시 요약하지 않습니다.
+    """
+
+    def __init__(self, summarizer, budget_tokens=None, keep_recent=None):
+        """
+        summarizer: async (이전 요약, 새로 요약할 기록 텍스트) -> 갱신된 요약
+        """
+        self.summarizer = summarizer
+        self.budget_tokens = int(budget_tokens or os.getenv("DEBATE_CONTEXT_TOKENS", 6000))
+        self.keep_recent = int(keep_recent or os.getenv("DEBATE_CONTEXT_RECENT", 4))
+
+        self.summary = ""
+        self.summarized_upto = 0     # discussion_log에서 요약에 반영된 항목 수
+        self._token_cache = {}       # 항목 인덱스 -> 토큰 수
+        self.calls = []              # [(용도, 입력 맥락 토큰 수), ...]
+        self.summary_updates = 0
+
+    @staticmethod
+    def _format_entry(item):
+        return f"\n\n[{item['speaker']}]: {item['message']}" if item.get('message') else ""
+
+    def _entry_tokens(self, index, item):
+        if index not in self._token_cache:
+            self._token_cache[index] = count_tokens(self._format_entry(item))
+        return self._token_cache[index]
+
+    async def render(self, discussion_log, purpose="context"):
+        """현재 토론 기록을 예산에 맞춘 텍스트로 반환하고, 사용한 토큰 수를 기록합니다."""
+        tokens = [self._entry_tokens(i, item) for i, item in enumerate(discussion_log)]
+
+        if sum(tokens) <= self.budget_tokens and self.summarized_upto == 0:
+            text = "".join(self._format_entry(item) for item in discussion_log)
+            return self._record(purpose, text)
+
+        # 최근 발언이 예산을 넘으면 원문으로 두는 개수를 줄입니다. (최소 1개)
+        keep = min(self.keep_recent, len(discussion_log))
+        while keep > 1 and sum(tokens[-keep:]) > self.budget_tokens // 2:
+            keep -= 1
+        split = max(self.summarized_upto, len(discussion_log) - keep)
+
+        if split > self.summarized_upto:
+            new_history = "".join(self._format_entry(item) for item in discussion_log[self.summarized_upto:split])
+            self.summary = await self.summarizer(self.summary, new_history)
+            self.summarized_upto = split
+            self.summary_updates += 1
+
+        recent = "".join(self._format_entry(item) for item in discussion_log[split:])
+        text = f"\n\n[이전 토론 요약]: {self.summary}{recent}"
+        return self._record(purpose, text)
+
+    def _record(self, purpose, text):
+        tokens = count_tokens(text)
+        self.calls.append((purpose, tokens))
+        print(f"🧮 [{purpose}] 토론 맥락 {tokens} 토큰 (예산 {self.budget_tokens})")
+        return text
+
+    def stats(self):
+        return {
+            "budget_tokens": self.budget_tokens,
+            "calls": len(self.calls),
+            "context_tokens_total": sum(t for _, t in self.calls),
+            "context_tokens_max": max((t for _, t in self.calls), default=0),
+            "summary_updates": self.summary_updates,
+        }
@@ -0,0 +1,146 @@
+# app/service/debate_log.py
+
+import os
+import time
+import asyncio
+from pathlib import Path
+from dotenv import load_dotenv
+
+from app.service.single_flight import SingleFlight
+
+load_dotenv()
+
+
+class DebateLogStore:
+    """
+    토론 NDJSON 이벤트 스트림을 '종목 + 시간 창(window)' 단위의 append-only 로그로 보관합니다.
+    - 같은 창 안에서 들어온 동일 종목 요청은 토론을 새로 돌리지 않고 로그를 재생합니다.
+    - 진행 중인 토론은 SingleFlight로 실시간 구독하고, 완료된 토론은 파일에서 즉시 재생합니다.
+
+    파일 규칙: 진행 중에는 '{key}.{pid}.ndjson.part'에 한 줄씩 추가하고,
+    정상 완료 시에만 '{key}.ndjson'으로 rename 합니다. (중단된 로그는 재사용하지 않음)
+    임시 파일 이름에 프로세스 ID를 붙여, 여러 워커가 같은 토론을 동시에 기록해도 서로의 파일을 덮어쓰지 않습니다.
+    """
+
+    def __init__(self, log_dir=None, window_seconds=None, retention_seconds=None):
+        self.log_dir = Path(log_dir or os.getenv("DEBATE_LOG_DIR", "debate_logs"))
+        # 0이면 로그 공유를 끄고 요청마다 토론을 새로 진행합니다.
+        self.window_seconds = int(window_seconds if window_seconds is not None
+                                  else os.getenv("DEBATE_WINDOW_SECONDS", 30 * 60))
+        self.retention_seconds = int(retention_seconds if retention_seconds is not None
+                                     else os.getenv("DEBATE_LOG_RETENTION", 24 * 60 * 60))
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        self._flights = SingleFlight()
+        self.computed = 0    # 실제로 토론을 실행한 횟수
+        self.replayed = 0    # 로그 재생(완료/진행 중)으로 처리한 횟수
+
+    @property
+    def enabled(self):
+        return self.window_seconds > 0
+
+    def current_window(self):
+        return int(time.time() // self.window_seconds) if self.enabled else 0
+
+    def make_key(self, ticker, max_turns, window=None):
+        if window is None:
+            window = self.current_window()
+        return f"{ticker}_t{max_turns}_{window}"
+
+    def _path(self, key, partial=False):
+        return self.log_dir / (f"{key}.{os.getpid()}.ndjson.part" if partial else f"{key}.ndjson")
+
+    def status(self, key):
+        """'live'(진행 중) / 'completed'(완료) / None(없음)"""
+        if self._flights.is_running(key):
+            return "live"
+        if self._path(key).exists():
+            return "completed"
+        return None
+
+    async def _read_completed(self, key):
+        path = self._path(key)
+        if not path.exists():
+            # 진행 중이던 토론이 오류로 끝나 완료 파일이 없으면 재생할 내용도 없습니다.
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield line
+
+    @staticmethod
+    def _append(f, line):
+        f.write(line)
+        f.flush()
+
+    async def _record(self, key, producer_factory):
+        """producer가 만든 메시지를 그대로 흘려보내면서 로그 파일에 한 줄씩 추가합니다."""
+        self._prune()
+        partial = self._path(key, partial=True)
+        completed = False
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                async for msg in producer_factory():
+                    # 파일 쓰기는 스레드에서 수행해 이벤트 루프를 막지 않습니다.
+                    await asyncio.to_thread(self._append, f, msg if msg.endswith("\n") else msg + "\n")
+                    yield msg
+            completed = True
+        finally:
+            if completed:
+                os.replace(partial, self._path(key))
+            else:
+                partial.unlink(missing_ok=True)
+
+    async def stream(self, key, producer_factory):
+        """
+        같은 키의 토론이 완료되어 있으면 재생하고, 진행 중이면 합류하며, 없으면 새로 실행합니다.
+        """
+        if not self.enabled:
+            self.computed += 1
+            async for msg in producer_factory():
+                yield msg
+            return
+
+        status = self.status(key)
+        if status == "completed":
+            self.replayed += 1
+            async for msg in self._read_completed(key):
+                yield msg
+            return
+
+        if status == "live":
+            self.replayed += 1
+        else:
+            self.computed += 1
+
+        async for msg in self._flights.stream(key, lambda: self._record(key, producer_factory)):
+            yield msg
+
+    async def replay(self, key):
+        """재생 전용 (새 토론을 시작하지 않음). 없는 키는 status()로 먼저 확인하세요."""
+        if self._flights.is_running(key):
+            self.replayed += 1
+            # 그 사이 토론이 끝나 있으면 완료된 파일을 재생합니다.
+            async for msg in self._flights.stream(key, lambda: self._read_completed(key)):
+                yield msg
+        elif self._path(key).exists():
+            self.replayed += 1
+            async for msg in self._read_completed(key):
+                yield msg
+
+    def _prune(self):
+        """보관 기간이 지난 로그 파일 정리"""
+        cutoff = time.time() - self.retention_seconds
+        for path in self.log_dir.glob("*.ndjson*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        return {
+            "window_seconds": self.window_seconds,
+            "computed": self.computed,
+            "replayed": self.replayed,
+            "live": self._flights.stats()["in_flight"],
+        }
@@ -0,0 +1,121 @@
+# app/service/freshness_cache.py
+
+import os
+import time
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 카테고리별 유효 시간(초)
+# - chart/news/finance: 마지막 수집 이후 TTL 동안은 재수집하지 않습니다.
+# - common(DART): 공시 번호(rcept_no)가 바뀌기 전까지 유효합니다.
+#   여기의 TTL은 '새 공시가 올라왔는지 다시 확인하는 주기'입니다.
+DEFAULT_TTLS = {
+    "common": int(os.getenv("DART_CHECK_TTL", 6 * 60 * 60)),
+    "news": int(os.getenv("NEWS_CACHE_TTL", 30 * 60)),
+    "chart": int(os.getenv("CHART_CACHE_TTL", 10 * 60)),
+    "finance": int(os.getenv("FINANCE_CACHE_TTL", 6 * 60 * 60)),
+}
+
+# 카테고리 하나를 건너뛰면 아낄 수 있는 검증(Validator) LLM 호출 수
+VALIDATOR_CALLS = {"common": 0, "news": 1, "chart": 1, "finance": 1}
+
+
+class KnowledgeFreshnessCache:
+    """
+    종목(ticker) x 카테고리별로 지식 베이스가 언제 갱신되었는지 기억하는 프로세스 단위 캐시.
+    StockService가 데이터 수집(Step 1) 전에 조회하여, 신선한 카테고리는
+    수집/검증/주입 단계를 통째로 건너뜁니다.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        # (ticker, category) -> {"updated_at": 갱신 시각, "marker": DART rcept_no 등}
+        self._entries = {}
+        # 종목별 마지막 지식 베이스 구축 소요 시간 (절약 시간 추정용)
+        self._build_seconds = {}
+        self._lock = threading.Lock()
+
+        self.hits = {category: 0 for category in self.ttls}
+        self.misses = {category: 0 for category in self.ttls}
+        self.revalidated = 0          # DART 공시 번호가 그대로여서 재사용한 횟수
+        self.full_hits = 0            # 수집 단계를 통째로 건너뛴 요청 수
+        self.saved_seconds = 0.0      # 건너뛴 수집 단계의 추정 소요 시간 합계
+        self.saved_llm_calls = 0      # 건너뛴 Validator LLM 호출 수
+
+    def _is_fresh(self, ticker, category, now):
+        entry = self._entries.get((ticker, category))
+        if not entry:
+            return False
+        return now - entry["updated_at"] < self.ttls.get(category, 0)
+
+    def stale_categories(self, ticker, categories):
+        """갱신이 필요한 카테고리 목록을 반환하고 hit/miss 카운터를 올립니다."""
+        now = time.time()
+        stale = []
+        with self._lock:
+            for category in categories:
+                if self._is_fresh(ticker, category, now):
+                    self.hits[category] = self.hits.get(category, 0) + 1
+                    self.saved_llm_calls += VALIDATOR_CALLS.get(category, 0)
+                else:
+                    self.misses[category] = self.misses.get(category, 0) + 1
+                    stale.append(category)
+
+            if not stale:
+                self.full_hits += 1
+                self.saved_seconds += self._build_seconds.get(ticker, 0.0)
+        return stale
+
+    def get_marker(self, ticker, category):
+        with self._lock:
+            entry = self._entries.get((ticker, category))
+            return entry["marker"] if entry else None
+
+    def mark_fresh(self, ticker, category, marker=None):
+        """카테고리가 방금 갱신되었음을 기록합니다."""
+        with self._lock:
+            self._entries[(ticker, category)] = {"updated_at": time.time(), "marker": marker}
+
+    def revalidate(self, ticker, category, marker):
+        """
+        TTL은 지났지만 원천 데이터의 식별자(marker)가 그대로라면 타임스탬프만 연장합니다.
+        (DART: 최신 rcept_no가 이전과 같으면 보고서를 다시 받지 않음)
+        """
+        with self._lock:
+            entry = self._entries.get((ticker, category))
+            if not entry or marker is None or entry["marker"] != marker:
+                return False
+            entry["updated_at"] = time.time()
+            self.revalidated += 1
+            self.saved_llm_calls += VALIDATOR_CALLS.get(category, 0)
+            return True
+
+    def record_build(self, ticker, seconds):
+        """실제 수집/검증/주입에 걸린 시간을 기록합니다."""
+        with self._lock:
+            self._build_seconds[ticker] = seconds
+
+    def invalidate(self, ticker, category=None):
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == ticker and (category is None or key[1] == category):
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            total_misses = sum(self.misses.values())
+            lookups = total_hits + total_misses
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "hit_ratio": round(total_hits / lookups, 3) if lookups else 0.0,
+                "dart_revalidated": self.revalidated,
+                "full_hits": self.full_hits,
+                "saved_seconds_estimate": round(self.saved_seconds, 1),
+                "saved_validator_calls": self.saved_llm_calls,
+                "tracked_entries": len(self._entries),
+                "ttls": dict(self.ttls),
+            }
@@ -0,0 +1,68 @@
+# app/service/knowledge_handoff.py
+
+import asyncio
+import numpy as np
+
+
+class KnowledgeHandoff:
+    """
+    방금 검증한 문서를 Chroma 적재를 기다리지 않고 토론에 메모리로 넘겨주는 보관소 (write-behind 모드, 종목별 1개)
+    - 적재(임베딩 + upsert)는 StockService가 백그라운드에서 수행하고, 그동안 검색은 이 보관소가 대신 답합니다.
+    - 문서가 k개 이하인 카테고리는 전부 그대로 반환합니다. (순위 불필요)
+    - 그보다 많으면 백그라운드 적재가 쓰는 문서 임베딩을 함께 기다려 메모리에서 코사인 유사도로 순위를 매깁니다.
+      문서 임베딩은 내용 해시 캐시에 남으므로 이후 Chroma 적재에서 같은 문서를 다시 임베딩하지 않습니다.
+    """
+
+    def __init__(self, vector_db, docs_by_category):
+        self.vector_db = vector_db
+        self.docs = {category: docs for category, docs in docs_by_category.items() if docs}
+        self._embedding_tasks = {}   # category -> 문서 임베딩 asyncio.Task
+        self.write_task = None       # 백그라운드 Chroma 적재 작업
+
+    def covers(self, category):
+        return category in self.docs
+
+    def embed_documents(self, category):
+        """카테고리 문서 임베딩 작업 (한 번만 시작하고, 적재와 순위 계산이 같은 작업을 공유합니다)"""
+        task = self._embedding_tasks.get(category)
+        if task is None:
+            texts = [doc.page_content for doc in self.docs[category]]
+            task = asyncio.ensure_future(self.vector_db.embeddings.aembed_documents(texts))
+            self._embedding_tasks[category] = task
+        return task
+
+    def search_small(self, category, k):
+        """문서가 k개 이하이면 전부 반환하고, 그보다 많으면 None"""
+        docs = self.docs[category]
+        return list(docs) if len(docs) <= k else None
+
+    def _rank(self, category, k, doc_vectors, query_vector):
+        doc_vectors = np.asarray(doc_vectors, dtype=np.float32)
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        scores = doc_vectors @ query_vector / (
+            np.linalg.norm(doc_vectors, axis=1) * np.linalg.norm(query_vector) + 1e-12
+        )
+        return [self.docs[category][i] for i in np.argsort(-scores)[:k]]
+
+    async def asearch(self, query, category, k):
+        docs = self.search_small(category, k)
+        if docs is not None:
+            return docs
+
+        doc_vectors = await self.embed_documents(category)
+        query_vector = (await self.vector_db.embeddings.aembed_queries([query]))[0]
+        return self._rank(category, k, doc_vectors, query_vector)
+
+    def search(self, query, category, k):
+        """동기 버전 (analyze 경로용). 문서 임베딩은 내용 해시 캐시를 거치므로 적재와 중복 호출되지 않습니다."""
+        docs = self.search_small(category, k)
+        if docs is not None:
+            return docs
+
+        task = self._embedding_tasks.get(category)
+        if task is not None and task.done() and not task.cancelled() and task.exception() is None:
+            doc_vectors = task.result()
+        else:
+            doc_vectors = self.vector_db.embeddings.embed_documents([doc.page_content for doc in self.docs[category]])
+        query_vector = self.vector_db.embeddings.embed_queries([query])[0]
+        return self._rank(category, k, doc_vectors, query_vector)
@@ -48,16 +48,8 @@ class StockDebateOrchestrator:
             clean_ticker = get_clean_ticker(raw_input)
             
             # 3. 매핑 데이터에서 정식 기업명 가져오기 (없으면 입력값 사용)
-            # ticker_manager._ticker_map에서 해당 심볼의 정식 이름을 역추적합니다.
-            info = ticker_manager._ticker_map.get(clean_ticker.split('.')[0])
-            company_name = raw_input # 기본값
-            
-            if info:
-                # 역매핑을 통해 정식 명칭 확인 (예: "삼성전자")
-                for name, data in ticker_manager._ticker_map.items():
-                    if data['symbol'] == info['symbol'] and name != data['symbol']:
-                        company_name = name
-                        break
+            # 심볼 -> 종목명 역색인으로 정식 명칭 확인 (예: "삼성전자")
+            company_name = ticker_manager.get_name(clean_ticker) or raw_input
 
             print(f"✅ 분석 대상 확정: {company_name} ({clean_ticker})")
             return company_name, clean_ticker
@@ -0,0 +1,178 @@
+# app/service/retrieval_cache.py
+
+import asyncio
+from langchain_core.documents import Document
+from app.repository.chroma_db import collection_version
+
+
+class DebateRetrievalCache:
+    """
+    토론 1회 동안 모든 에이전트가 공유하는 RAG 검색 캐시 (StockService가 만들어 에이전트에 주입)
+    - 키: (컬렉션 버전, 카테고리, 쿼리, k) -> 같은 검색은 토론 전체에서 한 번만 수행합니다.
+    - 동시에 들어온 같은 검색은 진행 중인 하나의 작업을 함께 기다립니다.
+    - 컬렉션에 새 문서가 쓰이면 버전이 바뀌므로 이전 결과는 더 이상 쓰이지 않습니다.
+    - awarm()으로 한 단계에서 필요한 검색을 모아, 쿼리 임베딩은 한 번의 API 호출로 처리합니다.
+    - 카테고리 문서가 k개 이하면(차트/재무처럼 문서 1개인 경우) 순위를 매길 필요가 없으므로
+      임베딩 없이 메타데이터 조회(get)로 전부 가져오고, 그보다 많을 때만 벡터 검색을 합니다.
+    - handoff(KnowledgeHandoff)가 있으면 아직 적재 중인 카테고리는 Chroma 대신 메모리의 문서로 답합니다.
+    """
+
+    def __init__(self, vector_db, handoff=None):
+        self.vector_db = vector_db
+        self.handoff = handoff
+        self._results = {}     # key -> 검색 결과 문서 리스트
+        self._inflight = {}    # key -> 진행 중인 asyncio.Task / Future
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0       # awarm 일괄 임베딩 호출 수
+        self.direct_fetches = 0  # 벡터 검색 없이 메타데이터 조회로 끝난 검색 수
+        self.handoff_reads = 0   # 적재 전 메모리 문서로 답한 검색 수
+        self.batched_queries = 0
+
+    def _key(self, query, category, k):
+        return (collection_version(self.vector_db), category, query, k)
+
+    def _fetch_small(self, k, search_filter):
+        """카테고리 문서가 k개 이하이면 전부 반환하고, 그보다 많으면 None (벡터 검색 필요)"""
+        if not search_filter:
+            return None
+        got = self.vector_db.get(where=search_filter, limit=k + 1, include=["documents", "metadatas"])
+        if len(got["ids"]) > k:
+            return None
+        self.direct_fetches += 1
+        return [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(got["documents"], got["metadatas"])
+        ]
+
+    def _from_handoff(self, category):
+        return self.handoff is not None and self.handoff.covers(category)
+
+    async def _asearch_uncached(self, query, category, k, search_filter):
+        if self._from_handoff(category):
+            self.handoff_reads += 1
+            return await self.handoff.asearch(query, category, k)
+
+        docs = await asyncio.to_thread(self._fetch_small, k, search_filter)
+        if docs is None:
+            docs = await self.vector_db.asimilarity_search(query, k=k, filter=search_filter)
+        return docs
+
+    async def asearch(self, query, category, k, search_filter):
+        key = self._key(query, category, k)
+        if key in self._results:
+            self.hits += 1
+            return self._results[key]
+        if key in self._inflight:
+            self.hits += 1
+            return await self._inflight[key]
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._asearch_uncached(query, category, k, search_filter))
+        self._inflight[key] = task
+        try:
+            docs = await task
+        finally:
+            self._inflight.pop(key, None)
+        self._results[key] = docs
+        return docs
+
+    async def awarm(self, requests):
+        """
+        requests: [(query, category, k, search_filter), ...]
+        아직 캐시에 없는 검색들의 쿼리를 한 번에 임베딩하고, 벡터로 각 검색을 동시에 수행해 캐시에 채웁니다.
+        실패하면 경고만 남기고, 각 에이전트가 나중에 개별 검색을 수행합니다.
+        """
+        pending = {}
+        handoff_requests = {}
+        for query, category, k, search_filter in requests:
+            key = self._key(query, category, k)
+            if key in self._results or key in self._inflight or key in pending or key in handoff_requests:
+                continue
+            if self._from_handoff(category):
+                handoff_requests[key] = (query, category, k)
+            else:
+                pending[key] = (query, k, search_filter)
+
+        # 적재 중인 카테고리는 메모리 문서로 답하므로 일괄 검색과 동시에 따로 수행합니다.
+        handoff_reads = asyncio.gather(
+            *[self.asearch(query, category, k, None) for query, category, k in handoff_requests.values()],
+            return_exceptions=True,   # 실패하면 에이전트가 나중에 개별 검색을 수행합니다.
+        )
+        if pending:
+            await self._awarm_batch(pending)
+        await handoff_reads
+
+    async def _awarm_batch(self, pending):
+        """pending: {key: (query, k, search_filter)} - 쿼리 임베딩 1회 + 벡터 검색 동시 수행"""
+        # 함께 기다릴 수 있도록 진행 중 표시를 먼저 남깁니다.
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in pending}
+        self._inflight.update(futures)
+
+        queries = []
+        try:
+            # 1. 작은 카테고리는 메타데이터 조회로 끝냅니다. (임베딩 불필요)
+            small = await asyncio.gather(*[
+                asyncio.to_thread(self._fetch_small, k, search_filter)
+                for _, k, search_filter in pending.values()
+            ])
+            # 2. 나머지 검색의 쿼리만 모아 한 번에 임베딩하고 벡터 검색을 동시에 수행합니다.
+            large = [(key, request) for (key, request), docs in zip(pending.items(), small) if docs is None]
+            queries = list(dict.fromkeys(query for _, (query, _, _) in large))
+            vectors = dict(zip(queries, await self.vector_db.embeddings.aembed_queries(queries))) if queries else {}
+            searched = await asyncio.gather(*[
+                self.vector_db.asimilarity_search_by_vector(vectors[query], k=k, filter=search_filter)
+                for _, (query, k, search_filter) in large
+            ])
+            results = dict(zip(pending, small))
+            results.update(zip((key for key, _ in large), searched))
+        except Exception as e:
+            print(f"⚠️ 일괄 검색 실패, 에이전트별 개별 검색으로 진행합니다: {e}")
+            for key, future in futures.items():
+                self._inflight.pop(key, None)
+                future.set_exception(e)
+                future.exception()   # 기다리는 쪽이 없어도 경고가 남지 않도록 소비
+            return
+
+        for key, docs in results.items():
+            self._inflight.pop(key, None)
+            self._results[key] = docs
+            futures[key].set_result(docs)
+
+        self.misses += len(pending)
+        if queries:
+            self.batches += 1
+            self.batched_queries += len(queries)
+        embed_note = f"쿼리 임베딩 {len(queries)}개를 API 1회로 처리" if queries else "쿼리 임베딩 없음"
+        print(f"📦 검색 {len(pending)}건 일괄 수행 (메타데이터 조회 {len(pending) - len(large)}건, {embed_note})")
+
+    def search(self, query, category, k, search_filter):
+        """동기 버전 (analyze 경로용)"""
+        key = self._key(query, category, k)
+        if key in self._results:
+            self.hits += 1
+            return self._results[key]
+
+        self.misses += 1
+        if self._from_handoff(category):
+            # 적재 중인 카테고리는 Chroma가 아직 비어 있을 수 있으므로 메모리 문서로만 답합니다.
+            self.handoff_reads += 1
+            docs = self.handoff.search(query, category, k)
+        else:
+            docs = self._fetch_small(k, search_filter)
+        if docs is None:
+            docs = self.vector_db.similarity_search(query, k=k, filter=search_filter)
+        self._results[key] = docs
+        return docs
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._results),
+            "batches": self.batches,
+            "batched_queries": self.batched_queries,
+            "direct_fetches": self.direct_fetches,
+            "handoff_reads": self.handoff_reads,
+        }
@@ -0,0 +1,119 @@
+# app/service/single_flight.py
+
+import asyncio
+
+
+class _Flight:
+    """
+    진행 중인 작업 하나의 이벤트 스트림.
+    생성된 메시지를 모두 보관하므로, 늦게 합류한 구독자도 처음부터 전부 받아볼 수 있습니다.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._cond = asyncio.Condition()
+
+    async def publish(self, event):
+        async with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    async def finish(self, error=None):
+        async with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with self._cond:
+                    while index >= len(self.events) and not self.done:
+                        await self._cond.wait()
+                    batch = self.events[index:]
+                    index = len(self.events)
+                    finished = self.done
+
+                for event in batch:
+                    yield event
+
+                if finished and index >= len(self.events):
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            self.subscribers -= 1
+
+
+class SingleFlight:
+    """
+    같은 키(예: 'prepare:005930')로 동시에 들어온 요청들이 하나의 실행을 공유하게 합니다.
+    - 첫 요청(leader)이 백그라운드 태스크로 작업을 시작합니다.
+    - 이후 요청은 새로 실행하지 않고 같은 NDJSON 이벤트 스트림을 구독합니다.
+    - 작업은 요청과 분리된 태스크에서 돌기 때문에, leader의 연결이 끊겨도 나머지 구독자에게 계속 전달됩니다.
+    - 구독자가 모두 떠나면 더 이상 LLM 호출을 쓰지 않도록 작업을 취소합니다.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._tasks = set()   # 실행 중인 태스크가 GC 되지 않도록 참조 유지
+        self.started = 0      # 실제로 실행된 작업 수
+        self.joined = 0       # 진행 중인 작업에 합류한 요청 수
+        self.cancelled = 0    # 구독자가 모두 떠나 취소된 작업 수
+
+    def is_running(self, key):
+        return key in self._flights
+
+    async def stream(self, key, producer_factory):
+        """
+        producer_factory: 호출 시 메시지를 yield 하는 async generator를 반환하는 함수
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            self.started += 1
+            flight.task = asyncio.create_task(self._run(key, flight, producer_factory))
+            self._tasks.add(flight.task)
+            flight.task.add_done_callback(self._tasks.discard)
+        else:
+            self.joined += 1
+
+        subscription = flight.subscribe()
+        try:
+            async for event in subscription:
+                yield event
+        finally:
+            await subscription.aclose()
+            if flight.subscribers == 0 and not flight.done:
+                # 마지막 구독자의 연결이 끊겼습니다. 새 요청이 취소 중인 작업에 합류하지 않도록 먼저 제거합니다.
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.cancelled += 1
+
+    async def _run(self, key, flight, producer_factory):
+        try:
+            async for event in producer_factory():
+                await flight.publish(event)
+            await flight.finish()
+        except Exception as e:
+            await flight.finish(e)
+        finally:
+            # 완료된 작업은 즉시 제거하여, 이후 요청은 신선도 캐시 등을 거쳐 새로 판단합니다.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "joined": self.joined,
+            "cancelled": self.cancelled,
+            "in_flight": {key: flight.subscribers for key, flight in self._flights.items()},
+        }
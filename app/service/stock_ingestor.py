@@ -2,11 +2,14 @@
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from app.repository.chroma_db import bump_collection_version
 
 class StockIngestor:
     def __init__(self, vector_db):
         """
         vector_db: 이미 초기화된 ChromaDB 등의 리트리버 객체
+        (get_vector_db가 만든 객체는 문서 임베딩 시 내용 해시 캐시를 먼저 조회하므로,
+         add_documents에 이전과 같은 조각이 들어오면 임베딩 API를 호출하지 않습니다.)
         """
         self.vector_db = vector_db
         # 텍스트를 적절한 크기(약 1000자)로 쪼개는 설정
@@ -34,17 +37,35 @@ class StockIngestor:
         except Exception:
             pass
 
-    def ingest_dart_data(self, ticker, company_name, text, report_title):
+    def get_ingested_rcept_no(self, ticker):
+        """저장된 DART 조각의 공시 접수번호(rcept_no). 없거나 번호 없이 저장된 옛 데이터면 None"""
+        res = self.vector_db.get(
+            where={"$and": [{"ticker": {"$eq": ticker}}, {"category": {"$eq": "common"}}]},
+            limit=1,
+            include=["metadatas"],
+        )
+        if not res['ids']:
+            return None
+        return (res['metadatas'][0] or {}).get("rcept_no")
+
+    def ingest_dart_data(self, ticker, company_name, text, report_title, rcept_no=None, checked=False):
         """
-        [지속성 데이터] DART 보고서는 'common' 카테고리로 저장하며,
-        이미 존재하면 추가 수집하지 않고 보존합니다.
+        [지속성 데이터] DART 보고서는 'common' 카테고리로 저장합니다.
+        같은 공시(rcept_no)가 이미 저장되어 있으면 건너뛰고,
+        새 공시가 나오면 새 조각을 먼저 저장한 뒤 이전 공시 조각을 지웁니다.
+        (교체 중에도 검색 결과가 비는 순간이 없습니다.)
+        checked: 호출 쪽에서 이미 저장된 접수번호와 비교했으면 True (중복 조회 생략)
+        해당 공시가 DB에 있으면(이미 있었거나 저장 성공) True, 저장에 실패하면 False를 반환합니다.
         """
 
-        # 이미 DRAT 보고서가 있다면 건너뜁니다.
-        if self.is_category_ingested(category="common"):
+        # 이미 같은 DART 보고서가 있다면 건너뜁니다.
+        # (rcept_no를 모르는 호출은 기존처럼 DART 데이터가 하나라도 있으면 건너뜁니다.)
+        if rcept_no is None and self.is_category_ingested(category="common"):
             print(f"⚠️ {company_name}({ticker}) DART 데이터가 이미 존재하여 수집을 건너뜁니다.")
-            return
-
+            return True
+        if rcept_no and not checked and self.get_ingested_rcept_no(ticker) == rcept_no:
+            print(f"⚠️ {company_name}({ticker}) DART 데이터(접수번호 {rcept_no})가 이미 존재하여 수집을 건너뜁니다.")
+            return True
 
         print(f"📦 {company_name}({ticker}) 지식 베이스 구축 시작 (Upsert, 중복 제거)")
 
@@ -57,7 +78,8 @@ class StockIngestor:
                 "company": company_name,
                 "source": "DART",
                 "category": "common",
-                "report_title": report_title
+                "report_title": report_title,
+                "rcept_no": rcept_no or "",
             }
         )
 
@@ -77,25 +99,44 @@ class StockIngestor:
         print(f"✂️ 전체 {len(all_split_docs)}개 조각 중 중복 {len(all_split_docs) - len(unique_docs)}개 발견 및 제거")
         print(f"✨ 최종 {len(unique_docs)}개 조각 저장 예정")
 
-        # 2. [핵심] 고유 ID 생성 
-        # 예: 005930_DART_0, 005930_DART_1 ...
-        # 이렇게 ID를 지정하면 다시 실행해도 같은 ID 위치에 덮어씌워집니다.
-        ids = [f"{ticker}_DART_{i}" for i in range(len(unique_docs))]
+        # 2. [핵심] 고유 ID 생성
+        # 예: 005930_DART_20240515000123_0, 005930_DART_20240515000123_1 ...
+        # 공시별로 ID가 달라 새 공시 조각과 이전 공시 조각이 섞이지 않습니다.
+        prefix = f"{ticker}_DART_{rcept_no}_" if rcept_no else f"{ticker}_DART_"
+        ids = [f"{prefix}{i}" for i in range(len(unique_docs))]
 
         # 3. ID와 함께 DB 저장
         try:
             # Chroma는 ids 인자를 주면 자동으로 Upsert 모드로 동작합니다.
             self.vector_db.add_documents(unique_docs, ids=ids)
+            bump_collection_version(self.vector_db)
             print(f"✅ {len(unique_docs)}개의 조각이 고유 ID와 함께 저장되었습니다.")
         except Exception as e:
             print(f"❌ DB 저장 중 오류 발생: {e}")
+            return False
+
+        # 4. 새 조각 저장이 끝난 뒤에만 이전 공시 조각을 정리합니다.
+        new_ids = set(ids)
+        old = self.vector_db.get(
+            where={"$and": [{"ticker": {"$eq": ticker}}, {"category": {"$eq": "common"}}]},
+            include=[],
+        )
+        stale_ids = [i for i in old['ids'] if i not in new_ids]
+        if stale_ids:
+            self.vector_db.delete(ids=stale_ids)
+            bump_collection_version(self.vector_db)
+            print(f"🧹 이전 공시 조각 {len(stale_ids)}개를 정리했습니다.")
+        return True
 
 
     def ingest_news_data(self, ticker, company_name, news_docs):
-        """[휘발성 데이터] 기존 뉴스를 삭제하고 최신 뉴스로 교체합니다."""
+        """
+        [휘발성 데이터] 기존 뉴스를 삭제하고 최신 뉴스로 교체합니다.
+        저장에 성공하면 True, 문서가 없거나 저장에 실패하면 False를 반환합니다.
+        """
         if not news_docs:
             print(f"⚠️ {company_name}({ticker}) 뉴스 문서가 없습니다. 건너뜁니다.")
-            return
+            return False
         
         print(f"🧹 {company_name}({ticker})의 기존 뉴스 조각을 정리 중...")
 
@@ -109,14 +150,18 @@ class StockIngestor:
         try:
             # Chroma는 ids 인자를 주면 자동으로 Upsert 모드로 동작합니다.
             self.vector_db.add_documents(news_docs, ids=ids)
+            bump_collection_version(self.vector_db)
             print(f"✨ {company_name} 최신 뉴스 {len(news_docs)}건 갱신 완료.")
+            return True
         except Exception as e:
-            # 처음 데이터를 넣을 때는 삭제할 데이터가 없어 에러가 날 수 있으므로 예외 처리합니다.
-            print(f"💡 기존 뉴스가 없거나 삭제 중 참고사항이 발생했습니다.: {e}")
+            # 임베딩/저장 실패 (기존 뉴스는 이미 지워졌으므로 호출 쪽에서 신선도를 기록하지 않아야 합니다)
+            print(f"❌ {company_name} 뉴스 저장 중 오류 발생: {e}")
+            return False
 
 
     def ingest_chart_data(self, ticker, company_name, chart_docs):
-        if not chart_docs: return
+        """[휘발성 데이터] 기존 차트를 최신 차트로 교체합니다. 저장 성공 여부를 반환합니다."""
+        if not chart_docs: return False
 
         self._clear_category(ticker, "chart")
 
@@ -127,17 +172,19 @@ class StockIngestor:
         try:
             # Chroma는 ids 인자를 주면 자동으로 Upsert 모드로 동작합니다.
             self.vector_db.add_documents(chart_docs, ids=ids)
+            bump_collection_version(self.vector_db)
             print(f"✨ {company_name} 최신 차트 {len(chart_docs)}건 갱신 완료.")
+            return True
         except Exception as e:
-            # 처음 데이터를 넣을 때는 삭제할 데이터가 없어 에러가 날 수 있으므로 예외 처리합니다.
-            print(f"💡 기존 차트가 없거나 삭제 중 참고사항이 발생했습니다.: {e}")
+            print(f"❌ {company_name} 차트 저장 중 오류 발생: {e}")
+            return False
 
     def ingest_finance_data(self, ticker, company_name, finance_docs):
         """
         [신규 - 휘발성 데이터] yfinance에서 가져온 핵심 재무 수치(PER, PBR 등)를 
-        'finance' 카테고리에 저장합니다.
+        'finance' 카테고리에 저장합니다. 저장 성공 여부를 반환합니다.
         """
-        if not finance_docs: return
+        if not finance_docs: return False
         
         self._clear_category(ticker, "finance")
         
@@ -148,8 +195,10 @@ class StockIngestor:
         try:
             # Chroma는 ids 인자를 주면 자동으로 Upsert 모드로 동작합니다.
             self.vector_db.add_documents(finance_docs, ids=ids)
+            bump_collection_version(self.vector_db)
             print(f"✨ {company_name} 최신 재무 데이터 {len(finance_docs)}건 갱신 완료.")
+            return True
         except Exception as e:
-            # 처음 데이터를 넣을 때는 삭제할 데이터가 없어 에러가 날 수 있으므로 예외 처리합니다.
-            print(f"💡 재무 데이터가 없거나 삭제 중 참고사항이 발생했습니다.: {e}")
+            print(f"❌ {company_name} 재무 데이터 저장 중 오류 발생: {e}")
+            return False
         
\ No newline at end of file
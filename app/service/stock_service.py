@@ -1,17 +1,29 @@
+import os
 import json
 import asyncio
-import re
 import functools
+import re
+import time
 import traceback
 
 # [유틸 및 매니저]
-from app.agents.ticker_agent import extract_company_name
-from app.utils.ticker_utils import get_clean_ticker
+from app.agents.ticker_agent import aextract_company_name, extraction_cache
+from app.utils.ticker_utils import get_clean_ticker, ticker_manager
+from app.service.ticker_resolver import ticker_pre_resolver
 from app.utils.llm import get_solar_model
+from app.utils.rate_limiter import acall_with_backoff, upstage_rate_limiter
+from app.utils.pacing import pacing_from_env
 
 # [DB 및 인제스터]
 from app.repository.chroma_db import get_vector_db
+from app.repository.embedding_cache import embedding_cache, query_embedding_cache
 from app.service.stock_ingestor import StockIngestor
+from app.service.freshness_cache import KnowledgeFreshnessCache
+from app.service.single_flight import SingleFlight
+from app.service.debate_log import DebateLogStore
+from app.service.debate_context import DebateContext
+from app.service.retrieval_cache import DebateRetrievalCache
+from app.service.knowledge_handoff import KnowledgeHandoff
 
 # [데이터 콜렉터]
 from app.service.dart_collector import DartCollector
@@ -28,9 +40,20 @@ from app.agents.judge_agent import JudgeAgent
 from app.agents.report_agent import InsightReportAgent
 from app.agents.validator_agent import DataValidator # [수정] Validator Import 추가
 
+
+def create_msg(speaker, msg_type, message, data=None):
+    """NDJSON 메시지 생성 헬퍼 (프론트엔드 규격 유지)"""
+    return json.dumps({
+        "type": msg_type,
+        "speaker": speaker,
+        "message": message,
+        "data": data
+    }) + "\n"
+
+
 class StockService:
     def __init__(self):
-        # 1. 공통 사용 LLM 초기화
+        # 1. 공통 사용 LLM 초기화 (get_solar_model은 레지스트리의 공유 인스턴스를 반환)
         self.news_llm = get_solar_model()
         self.chart_llm = get_solar_model()
         self.finance_llm = get_solar_model()
@@ -45,261 +68,495 @@ class StockService:
         self.finance_collector = FinanceCollector()
         self.validator = DataValidator()
 
+        # 종목/카테고리별 지식 베이스 신선도 캐시 (요청 간 공유)
+        self.freshness = KnowledgeFreshnessCache()
+
+        # 같은 종목에 대한 동시 요청이 수집/검증/주입을 한 번만 수행하도록 묶어줍니다.
+        self.single_flight = SingleFlight()
+
+        # 토론 이벤트 로그 (종목 + 시간 창 단위로 한 번만 토론하고 나머지는 재생)
+        self.debate_logs = DebateLogStore()
+
+        # 상호 토론 진행 방식
+        # - sequential: 라운드마다 사회자가 한 명을 지목 (기존 방식)
+        # - parallel: 라운드마다 여러 명을 지목하고 반박을 동시에 실행
+        self.debate_schedule = os.getenv("DEBATE_SCHEDULE", "sequential").lower()
+
+        # 토론 단계 사이 속도 조절 정책 (none / fixed / quota)
+        self.pacing = pacing_from_env()
+
+        # write-behind 모드: 검증된 뉴스/차트/재무 문서는 메모리로 바로 토론에 넘기고 Chroma 적재는 백그라운드에서 수행
+        self.write_behind = os.getenv("KNOWLEDGE_WRITE_BEHIND", "false").lower() == "true"
+        self.handoffs = {}   # pure_ticker -> 적재 중인 KnowledgeHandoff
+        self.write_behind_usage = {"started": 0, "completed": 0, "failed": 0}
+
+        # 토론 맥락 토큰 사용량 누적 통계
+        self.context_usage = {"debates": 0, "context_tokens_total": 0, "context_tokens_max": 0, "summary_updates": 0}
+        self.retrieval_usage = {"debates": 0, "hits": 0, "misses": 0}
+
         # 3. 상태와 무관한 공통 에이전트 초기화
         self.moderator_agent = ModeratorAgent(self.moderator_llm)
         self.judge_agent = JudgeAgent(self.judge_llm)
         self.report_agent = InsightReportAgent(self.report_llm)
 
-    def _format_history_for_llm(self, history_list):
-        text_log = ""
-        for item in history_list:
-            if item.get('message'):
-                text_log += f"\n\n[{item['speaker']}]: {item['message']}"
-        return text_log
+    def get_stats(self):
+        """운영 모니터링용 캐시/처리 통계"""
+        return {
+            "knowledge_cache": self.freshness.stats(),
+            "single_flight": self.single_flight.stats(),
+            "debate_logs": self.debate_logs.stats(),
+            "llm_rate_limiter": upstage_rate_limiter.stats(),
+            "debate_pacing": self.pacing.stats(),
+            "debate_context": self.context_usage,
+            "debate_retrieval": self.retrieval_usage,
+            "write_behind": {"enabled": self.write_behind, "pending": len(self.handoffs), **self.write_behind_usage},
+            "embedding_cache": embedding_cache.stats(),
+            "query_embedding_cache": query_embedding_cache.stats(),
+            "ticker_resolution": ticker_pre_resolver.stats(),
+            "ticker_extraction_cache": extraction_cache.stats(),
+        }
+
+    def _parse_moderator_output(self, mod_output, agent_map):
+        """
+        사회자 응답을 (종료 여부, [(지목된 에이전트 키 또는 None, 지시문), ...])로 변환합니다.
+        병렬 포맷(INSTRUCTION_<발언자>)과 기존 단일 포맷(NEXT_SPEAKER / INSTRUCTION)을 모두 지원합니다.
+        """
+        status_match = re.search(r"STATUS:\s*\[?(TERMINATE|CONTINUE)\]?", mod_output)
+        if status_match and "TERMINATE" in status_match.group(1):
+            return True, []
+
+        multi_matches = re.findall(
+            r"INSTRUCTION_(Chart|News|Finance):\s*(.*?)(?=\n\s*INSTRUCTION_|\Z)", mod_output, re.DOTALL | re.I
+        )
+        assignments = []
+        for target_key_raw, inst_text in multi_matches:
+            target_key = next((k for k in agent_map if k.lower() == target_key_raw.lower()), None)
+            inst_text = inst_text.strip()
+            if target_key and inst_text and all(target_key != k for k, _ in assignments):
+                assignments.append((target_key, inst_text))
+        if assignments:
+            return False, assignments
+
+        speaker_match = re.search(r"NEXT_SPEAKER:\s*\[?(\w+)\]?", mod_output)
+        instruction_match = re.search(r"INSTRUCTION:\s*(.*)", mod_output, re.DOTALL)
+        if speaker_match and instruction_match:
+            target_key_raw = speaker_match.group(1).strip()
+            target_key = next((k for k in agent_map if k.lower() in target_key_raw.lower()), None)
+            return False, [(target_key, instruction_match.group(1).strip())]
+        return False, []
+
+    def _record_context_usage(self, debate_context):
+        usage = debate_context.stats()
+        self.context_usage["debates"] += 1
+        self.context_usage["context_tokens_total"] += usage["context_tokens_total"]
+        self.context_usage["context_tokens_max"] = max(self.context_usage["context_tokens_max"], usage["context_tokens_max"])
+        self.context_usage["summary_updates"] += usage["summary_updates"]
+
+    def _record_retrieval_usage(self, retrieval_cache):
+        usage = retrieval_cache.stats()
+        self.retrieval_usage["debates"] += 1
+        self.retrieval_usage["hits"] += usage["hits"]
+        self.retrieval_usage["misses"] += usage["misses"]
+
+    async def _run_with_retry(self, func, *args, **kwargs):
+        """
+        func: 에이전트의 비동기 메서드 (aanalyze, afacilitate 등)
+        ainvoke 기반이므로 호출 대기 중에 executor 스레드를 점유하지 않습니다.
+        호출 속도는 전역 rate limiter가 조절하고, 429 발생 시 Retry-After/지수 백오프로 재시도합니다.
+        """
+        return await acall_with_backoff(func, *args, max_retries=5, **kwargs)
 
     async def handle_user_task(self, user_input: str, max_turns: int = 3):
         try:
-            # 메시지 생성 헬퍼 (프론트엔드 규격 유지)
-            def create_msg(speaker, msg_type, message, data=None):
-                return json.dumps({
-                    "type": msg_type,
-                    "speaker": speaker,
-                    "message": message,
-                    "data": data
-                }) + "\n"
-
-            loop = asyncio.get_event_loop()
-
-            async def run_with_retry(func, *args, **kwargs):
-                wrapped_func = functools.partial(func, *args, **kwargs)
-                max_retries = 5
-                for attempt in range(max_retries):
-                    try:
-                        return await loop.run_in_executor(None, wrapped_func)
-                    except Exception as e:
-                        if "429" in str(e) or "too_many_requests" in str(e):
-                            if attempt < max_retries - 1:
-                                wait_time = 5 * (attempt + 1)
-                                print(
-                                    f"⚠️ API 호출 제한(429) 감지. {wait_time}초 대기 후 재시도합니다. ({attempt + 1}/{max_retries})")
-                                await asyncio.sleep(wait_time)
-                                continue
-                        raise e
-
             # ------------------------------------------------------------------
             # [Step 0] 종목 식별 및 DB 연결
             # ------------------------------------------------------------------
             yield create_msg("system", "status", f"시스템이 '{user_input}' 에서 종목을 식별 중입니다.")
-            refined_name = extract_company_name(user_input)
+            # 종목코드/심볼/정식 명칭/줄임말은 LLM 호출 없이 로컬 색인으로 바로 식별합니다.
+            # (색인이 아직 없으면 로드/생성이 일어날 수 있으므로 이벤트 루프 밖 스레드에서 실행)
+            fast_symbol = await asyncio.to_thread(ticker_pre_resolver.resolve, user_input)
+            ticker_pre_resolver.record(fast_symbol is not None)
+            if fast_symbol:
+                refined_name = await asyncio.to_thread(ticker_manager.get_name, fast_symbol) or fast_symbol
+            else:
+                refined_name = await aextract_company_name(user_input)
             if refined_name == "NONE":
                 yield create_msg("system", "error", "종목을 찾을 수 없습니다.")
                 return
 
-            ticker = get_clean_ticker(refined_name)
+            ticker = await asyncio.to_thread(get_clean_ticker, fast_symbol or refined_name)
             yield create_msg("system", "status", f"대상 종목: {refined_name} ({ticker})")
             pure_ticker = ticker.split('.')[0] # 005930.KS -> 005930
 
-            # 종목 전용 DB 및 인제스터 준비
+            # 종목 전용 DB 준비
             db = get_vector_db(pure_ticker)
-            ingestor = StockIngestor(db)
 
-            # ------------------------------------------------------------------
-            # [Step 1] 데이터 수집 (Raw Data Collection)
-            # ------------------------------------------------------------------
-            yield create_msg("system", "status", f"'{refined_name}'의 최신 데이터를 수집하여 지식 베이스를 갱신합니다.")
+            # 같은 시간 창 안에 완료되었거나 진행 중인 동일 종목 토론이 있으면 로그만 재생하므로
+            # 지식 베이스 갱신(수집/검증/주입)도 건너뜁니다.
+            debate_key = self.debate_logs.make_key(pure_ticker, max_turns)
+            debate_status = self.debate_logs.status(debate_key)
+
+            # [Step 1] 지식 베이스 갱신 - 같은 종목의 동시 요청은 하나의 실행을 공유합니다.
+            if debate_status is None:
+                prepare_key = f"prepare:{pure_ticker}"
+                if self.single_flight.is_running(prepare_key):
+                    yield create_msg("system", "status", f"'{refined_name}' 분석이 이미 진행 중입니다. 진행 중인 데이터 수집에 합류합니다.")
+                async for msg in self.single_flight.stream(
+                    prepare_key, lambda: self._prepare_knowledge_base(refined_name, ticker, pure_ticker, db)
+                ):
+                    yield msg
+
+            # [Step 2~6] 토론 - 같은 시간 창 안의 동일 종목 토론은 로그를 재생합니다.
+            if debate_status == "completed":
+                yield create_msg("system", "status", "최근 완료된 동일 종목 토론 결과를 불러옵니다.")
+            elif debate_status == "live":
+                yield create_msg("system", "status", "진행 중인 동일 종목 토론을 함께 시청합니다.")
+
+            async for msg in self.debate_logs.stream(
+                debate_key, lambda: self._run_debate(refined_name, ticker, pure_ticker, db, max_turns)
+            ):
+                yield msg
 
-            # 병렬 데이터 수집
-            d_task = loop.run_in_executor(None, self.dart_collector.get_latest_report_text, pure_ticker, refined_name)
-            n_task = loop.run_in_executor(None, self.news_collector.fetch_news, pure_ticker, refined_name)
-            c_task = loop.run_in_executor(None, self.chart_collector.fetch_technical_data, ticker, refined_name)
-            f_task = loop.run_in_executor(None, self.finance_collector.fetch_financial_summary, ticker, refined_name)
+        except Exception as e:
+            traceback.print_exc()
+            yield create_msg("system", "error", f"분석 중 오류 발생: {str(e)}")
 
-            # [수정] 수집된 결과를 _raw 변수에 저장
-            (dart_text_raw, dart_title), n_docs_raw, c_docs_raw, f_docs_raw = await asyncio.gather(d_task, n_task, c_task, f_task)
+    async def replay_debate(self, pure_ticker: str, window: int = None, max_turns: int = 3):
+        """완료되었거나 진행 중인 토론 로그를 새 구독자에게 그대로 재생합니다."""
+        debate_key = self.debate_logs.make_key(pure_ticker, max_turns, window)
+        async for msg in self.debate_logs.replay(debate_key):
+            yield msg
+
+    async def _prepare_knowledge_base(self, refined_name, ticker, pure_ticker, db):
+        """
+        [Step 1 ~ 1.6] 데이터 수집 -> 검증 -> DB 주입
+        SingleFlight를 통해 종목당 하나만 실행되며, 생성한 메시지는 합류한 모든 요청에 전달됩니다.
+        """
+        loop = asyncio.get_running_loop()
+        ingestor = StockIngestor(db)
+
+        # ------------------------------------------------------------------
+        # [Step 1] 데이터 수집 (Raw Data Collection)
+        # ------------------------------------------------------------------
+        # 신선도 캐시 확인: 최근에 갱신된 카테고리는 수집/검증/주입을 건너뜁니다.
+        stale = self.freshness.stale_categories(pure_ticker, ["common", "news", "chart", "finance"])
+
+        # DART는 TTL이 지났더라도 공시 번호(rcept_no)가 그대로면 재사용합니다.
+        # 본문 다운로드 전에 목록만 조회해 메모리 캐시와 DB에 저장된 접수번호를 비교합니다.
+        dart_filing = None
+        if "common" in stale:
+            dart_filing = await loop.run_in_executor(None, self.dart_collector.get_latest_filing, pure_ticker)
+            rcept_no = dart_filing["rcept_no"]
+            if self.freshness.revalidate(pure_ticker, "common", rcept_no):
+                stale.remove("common")
+            elif await loop.run_in_executor(None, ingestor.get_ingested_rcept_no, pure_ticker) == rcept_no:
+                # 재시작 등으로 메모리 캐시가 비었어도 DB에 같은 공시가 있으면 재사용
+                self.freshness.mark_fresh(pure_ticker, "common", marker=rcept_no)
+                stale.remove("common")
+
+        if not stale:
+            yield create_msg("system", "status", f"'{refined_name}'의 지식 베이스가 최신 상태입니다. 바로 토론을 시작합니다.")
+        else:
+            yield create_msg("system", "status", f"'{refined_name}'의 최신 데이터를 수집하여 지식 베이스를 갱신합니다.")
+            build_started = time.time()
+
+            # 병렬 데이터 수집 (갱신이 필요한 카테고리만)
+            collect_tasks = {}
+            if "common" in stale:
+                collect_tasks["common"] = loop.run_in_executor(None, self.dart_collector.get_latest_report_text, pure_ticker, refined_name, dart_filing)
+            if "news" in stale:
+                collect_tasks["news"] = loop.run_in_executor(None, self.news_collector.fetch_news, pure_ticker, refined_name)
+            if "chart" in stale:
+                collect_tasks["chart"] = loop.run_in_executor(None, self.chart_collector.fetch_technical_data, ticker, refined_name)
+            if "finance" in stale:
+                collect_tasks["finance"] = loop.run_in_executor(None, self.finance_collector.fetch_financial_summary, ticker, refined_name)
+
+            # [수정] 수집된 결과를 카테고리별 raw 데이터로 저장
+            raw_data = dict(zip(collect_tasks.keys(), await asyncio.gather(*collect_tasks.values())))
 
             # ------------------------------------------------------------------
             # [Step 1.5] 데이터 검증 (Data Validation & Filtering)
             # ------------------------------------------------------------------
             yield create_msg("system", "status", "수집된 데이터의 신뢰성을 검증하고 노이즈를 제거합니다.")
 
-            # [수정] ticker 인자를 추가로 전달합니다. (str() 변환은 Collector 리턴 타입에 따라 결정)
             # 이제 Validator가 List[Document]를 직접 반환합니다.
-            v_n_task = loop.run_in_executor(None, self.validator.validate_and_filter, "news", refined_name, pure_ticker, str(n_docs_raw))
-            v_c_task = loop.run_in_executor(None, self.validator.validate_and_filter, "chart", refined_name, pure_ticker, str(c_docs_raw))
-            v_f_task = loop.run_in_executor(None, self.validator.validate_and_filter, "finance", refined_name, pure_ticker, str(f_docs_raw))
-            
-            # 결과 받기 (이제 이 변수들은 이미 [Document] 리스트입니다)
-            n_docs, c_docs, f_docs = await asyncio.gather(v_n_task, v_c_task, v_f_task)
-
-            # [Step 1.6] DB 주입 (Ingestion)
-            # 별도의 변환 과정 없이 바로 주입합니다. (코드가 훨씬 깔끔해짐)
-            ingestor.ingest_dart_data(pure_ticker, refined_name, dart_text_raw, dart_title)
-            ingestor.ingest_news_data(pure_ticker, refined_name, n_docs)
-            ingestor.ingest_chart_data(pure_ticker, refined_name, c_docs)
-            ingestor.ingest_finance_data(pure_ticker, refined_name, f_docs)
-
-            
-
-            # ------------------------------------------------------------------
-            # [Step 2] 에이전트 런타임 생성 (Retriever 주입)
-            # ------------------------------------------------------------------
-            # 이제 DB가 준비되었으므로 각 에이전트에게 db(retriever)를 전달하여 생성합니다.
-            finance_agent = FinanceAgent("재무 분석가", "Finance", db)
-            news_agent = NewsAgent("뉴스 분석가", "News", db)
-            chart_agent = ChartAgent("차트 분석가", "Chart", db)
-
-            agent_map = {
-                "Finance": {"instance": finance_agent, "name": "재무 분석가", "code": "finance"},
-                "News": {"instance": news_agent, "name": "뉴스 분석가", "code": "news"},
-                "Chart": {"instance": chart_agent, "name": "차트 분석가", "code": "chart"}
-            }
-
-            discussion_log = []
-
-            # ------------------------------------------------------------------
-            # [Step 3] 전문가 기조 발언 (Opening)
-            # ------------------------------------------------------------------
-            opening_log = {
-                "speaker": "사회자", "code": "moderator",
-                "message": "지금부터 토론을 시작합니다. 각 전문가는 분석 결과를 발표해주세요.",
-                "type": "opening"
-            }
-            discussion_log.append(opening_log)
-
-            yield create_msg("system", "status", "전문가들이 지식 베이스를 바탕으로 분석을 시작합니다.")
-
-            async def run_agent_analyze(tag, agent_info):
-                # 에이전트 내부에서 RAG 검색을 수행하므로 ticker 정보만 넘깁니다.
-                res = await run_with_retry(agent_info["instance"].analyze, refined_name, pure_ticker, debug = True)
-                return tag, res
-
-            opening_tasks = [
-                run_agent_analyze("Finance", agent_map["Finance"]),
-                run_agent_analyze("News", agent_map["News"]),
-                run_agent_analyze("Chart", agent_map["Chart"])
+            validate_categories = [c for c in ["news", "chart", "finance"] if c in raw_data]
+            validate_tasks = [
+                self.validator.avalidate_and_filter(category, refined_name, pure_ticker, str(raw_data[category]))
+                for category in validate_categories
             ]
+            validated = dict(zip(validate_categories, await asyncio.gather(*validate_tasks)))
 
-            for completed_task in asyncio.as_completed(opening_tasks):
-                tag, stmt = await completed_task
-                info = agent_map[tag]
-                if tag == "Chart":
-                    yield create_msg("chart", "status", "기술적 지표 분석 완료. 추세를 확인했습니다.")
-                elif tag == "News":
-                    yield create_msg("news", "status", "시장 심리 및 뉴스 분석 완료. 트렌드를 파악했습니다.")
-                elif tag == "Finance":
-                    yield create_msg("finance", "status", "기업 가치 및 재무 건전성 평가를 마쳤습니다.")
-
-                yield create_msg(info["code"], "debate", stmt)
-                discussion_log.append({"speaker": info["name"], "code": info["code"], "message": stmt, "type": "opening"})
-
-            await asyncio.sleep(2)
-            # ------------------------------------------------------------------
-            # [Step 4] 상호 토론 (Reasoning)
-            # ------------------------------------------------------------------
-            yield create_msg("system", "status", "분석 내용을 바탕으로 상호 토론을 시작합니다.")
-            for turn in range(max_turns):
-                yield create_msg("system", "status", f"상호 토론 {turn +1}/{max_turns} 라운드")
-
-                # [추가 부분] 7라운드 이상 시 사회자의 Temperature를 낮춰 수렴 유도
-                if turn >= 7:
-                    self.moderator_agent.llm = self.moderator_llm.bind(temperature=0.1)
-
-
-                current_context = self._format_history_for_llm(discussion_log)
-                mod_output = await run_with_retry(self.moderator_agent.facilitate, refined_name, current_context)
-
-                # 사회자 판단 파싱
-                status_match = re.search(r"STATUS:\s*\[?(TERMINATE|CONTINUE)\]?", mod_output)
-                speaker_match = re.search(r"NEXT_SPEAKER:\s*\[?(\w+)\]?", mod_output)
-                instruction_match = re.search(r"INSTRUCTION:\s*(.*)", mod_output, re.DOTALL)
-
-                if status_match and "TERMINATE" in status_match.group(1):
-                    yield create_msg("system", "status", "사회자가 토론 종료를 선언했습니다.")
-                    break
-
-                if speaker_match and instruction_match:
-                    target_key_raw = speaker_match.group(1).strip()
-                    inst_text = instruction_match.group(1).strip()
-
-                    yield create_msg("moderator", "debate", inst_text)
-                    discussion_log.append({"speaker": "사회자", "code": "moderator", "message": inst_text, "type": "instruction"})
-
-                    target_key = next((k for k in agent_map if k.lower() in target_key_raw.lower()), None)
-                    if target_key:
-                        target = agent_map[target_key]
-                        yield create_msg(target['code'], "status", f"{target['name']}가 반박 의견을 제시합니다.")
-                        rebuttal = await run_with_retry(
-                            target["instance"].analyze, 
-                            refined_name, pure_ticker,
-                            debate_context=f"[사회자 지시]: {inst_text}\n\n[이전 토론 맥락]: {current_context}"
-                        )
-                        yield create_msg(target["code"], "debate", rebuttal)
-                        discussion_log.append({"speaker": target["name"], "code": target["code"], "message": rebuttal, "type": "rebuttal"})
-                        await asyncio.sleep(2)
-            # ------------------------------------------------------------------
-            # [Step 5] 최후 변론 (Closing)
-            # ------------------------------------------------------------------
-            yield create_msg("system", "status", "최후 변론을 진행합니다.")
-            closing_msg = {"speaker": "사회자", "code": "moderator", "message": "토론을 마치겠습니다. 최후 변론을 해주세요.",
-                           "type": "closing"}
-            discussion_log.append(closing_msg)
-            current_context = self._format_history_for_llm(discussion_log)
-
-            for role_name in ["Chart", "News", "Finance"]:
-                agent = agent_map[role_name]
-
-                closing_context_prompt = f"""
-                {current_context}
-                --- [SYSTEM INSTRUCTION] ---
-                지금까지의 토론 흐름을 참고하여, '최후 변론'을 하십시오.
-                """
-
-                closing_stmt = await run_with_retry(
-                    agent["instance"].analyze,
-                    refined_name, ticker,
-                    debate_context=closing_context_prompt
+            # [Step 1.6] DB 주입 (Ingestion)
+            # 실제로 주입된 카테고리만 신선도 캐시에 기록합니다.
+            # DART는 위에서 저장된 접수번호와 이미 비교했으므로 중복 조회 없이 바로 저장합니다.
+            # 저장에 성공한 경우에만 접수번호를 기록합니다. (실패하면 다음 요청에서 다시 시도)
+            if "common" in raw_data:
+                dart_text_raw, dart_title = raw_data["common"]
+                dart_saved = await loop.run_in_executor(
+                    None, functools.partial(
+                        ingestor.ingest_dart_data, pure_ticker, refined_name, dart_text_raw, dart_title,
+                        rcept_no=dart_filing["rcept_no"], checked=True,
+                    )
                 )
-                yield create_msg(agent['code'], "status", "최후 변론을 마쳤습니다.")
-                yield create_msg(agent["code"], "debate", closing_stmt)
-                discussion_log.append(
-                    {"speaker": agent["name"], "code": agent["code"], "message": closing_stmt, "type": "closing"})
-
-                await asyncio.sleep(2)
-            yield create_msg("system", "status", "사회자가 토론을 요약 중입니다.")
-            current_context = self._format_history_for_llm(discussion_log)
-            summary_text = await run_with_retry(self.moderator_agent.summarize_debate, refined_name, current_context)
-            yield create_msg("moderator", "debate", summary_text)
-            discussion_log.append({
-                "speaker": "사회자",
-                "code": "moderator",
-                "message": summary_text,
-                "type": "summary"
-            })
-
-            # ------------------------------------------------------------------
-            # [Step 6] 요약 및 판결 (Finalize)
-            # ------------------------------------------------------------------
-            yield create_msg("system", "status", "최종 투자 의견 및 최종 리포트를 생성합니다.")
-
-            final_context = self._format_history_for_llm(discussion_log)
-            
-            # 2. 판사 최종 판결
-            decision = await run_with_retry(self.judge_agent.adjudicate, refined_name, final_context)
-            
-            # 3. 리포트 생성
-            report = await run_with_retry(self.report_agent.generate_report, refined_name, pure_ticker, final_context)
-
-            # [최종 결과 전송]
-            result_data = {
-                "summary": report,
-                "conclusion": decision,
-                "discussion_log": discussion_log
-            }
-            yield create_msg("system", "result", "토론이 완료되었습니다.", data=result_data)
+                if dart_saved:
+                    self.freshness.mark_fresh(pure_ticker, "common", marker=dart_filing["rcept_no"])
+
+            if self.write_behind and any(validated.values()):
+                # 적재를 기다리지 않고 메모리 보관소로 토론에 넘깁니다. (적재 중 들어온 같은 종목 토론도 이 보관소를 사용)
+                handoff = KnowledgeHandoff(db, validated)
+                self.handoffs[pure_ticker] = handoff
+                for category in handoff.docs:
+                    self.freshness.mark_fresh(pure_ticker, category)
+                handoff.write_task = asyncio.create_task(
+                    self._write_behind(handoff, ingestor, refined_name, pure_ticker, build_started))
+                self.write_behind_usage["started"] += 1
+                yield create_msg("system", "status", "최신 데이터를 바로 토론에 사용하고, 지식 베이스 저장은 백그라운드에서 진행합니다.")
+                return
 
+            # 저장에 실패한 카테고리는 신선도를 기록하지 않아 다음 요청에서 다시 수집합니다.
+            ingest_funcs = self._category_ingestors(ingestor)
+            for category, docs in validated.items():
+                if ingest_funcs[category](pure_ticker, refined_name, docs):
+                    self.freshness.mark_fresh(pure_ticker, category)
+
+            self.freshness.record_build(pure_ticker, time.time() - build_started)
+
+    def _category_ingestors(self, ingestor):
+        return {
+            "news": ingestor.ingest_news_data,
+            "chart": ingestor.ingest_chart_data,
+            "finance": ingestor.ingest_finance_data,
+        }
+
+    async def _write_behind(self, handoff, ingestor, refined_name, pure_ticker, build_started):
+        """write-behind 모드의 백그라운드 Chroma 적재. 끝나면 메모리 보관소를 내려놓습니다."""
+        loop = asyncio.get_running_loop()
+        ingest_funcs = self._category_ingestors(ingestor)
+        try:
+            for category, docs in handoff.docs.items():
+                # 토론 쪽 메모리 순위 계산과 같은 임베딩 작업을 공유합니다. (결과는 임베딩 캐시에 저장되어 적재 시 재사용)
+                await handoff.embed_documents(category)
+                # 저장 실패는 인제스터가 False로 알려 주므로(기존 문서는 이미 지워진 상태) 실패로 처리합니다.
+                if not await loop.run_in_executor(None, ingest_funcs[category], pure_ticker, refined_name, docs):
+                    raise RuntimeError(f"'{category}' 카테고리 Chroma 저장 실패")
+            self.freshness.record_build(pure_ticker, time.time() - build_started)
+            self.write_behind_usage["completed"] += 1
+            print(f"💾 {refined_name}({pure_ticker}) 백그라운드 지식 베이스 적재 완료")
         except Exception as e:
+            # 적재에 실패하면 다음 요청에서 다시 수집하도록 신선도 기록을 지웁니다.
             traceback.print_exc()
-            yield create_msg("system", "error", f"분석 중 오류 발생: {str(e)}")
+            self.write_behind_usage["failed"] += 1
+            for category in handoff.docs:
+                self.freshness.invalidate(pure_ticker, category)
+            print(f"⚠️ {refined_name}({pure_ticker}) 백그라운드 적재 실패: {e}")
+        finally:
+            if self.handoffs.get(pure_ticker) is handoff:
+                del self.handoffs[pure_ticker]
+
+    async def _run_debate(self, refined_name, ticker, pure_ticker, db, max_turns):
+        """[Step 2 ~ 6] 에이전트 생성 -> 기조 발언 -> 상호 토론 -> 최후 변론 -> 판결/리포트"""
+        # ------------------------------------------------------------------
+        # [Step 2] 에이전트 런타임 생성 (Retriever 주입)
+        # ------------------------------------------------------------------
+        # 이제 DB가 준비되었으므로 각 에이전트에게 db(retriever)를 전달하여 생성합니다.
+        # 검색 캐시는 토론 1회 동안 세 에이전트가 공유합니다. (공통 DART 검색 등 중복 검색 제거)
+        # write-behind 모드에서 아직 적재 중인 카테고리는 메모리 보관소에서 검색합니다.
+        retrieval_cache = DebateRetrievalCache(db, handoff=self.handoffs.get(pure_ticker))
+        finance_agent = FinanceAgent("재무 분석가", "Finance", db, retrieval_cache=retrieval_cache)
+        news_agent = NewsAgent("뉴스 분석가", "News", db, retrieval_cache=retrieval_cache)
+        chart_agent = ChartAgent("차트 분석가", "Chart", db, retrieval_cache=retrieval_cache)
+
+        agent_map = {
+            "Finance": {"instance": finance_agent, "name": "재무 분석가", "code": "finance"},
+            "News": {"instance": news_agent, "name": "뉴스 분석가", "code": "news"},
+            "Chart": {"instance": chart_agent, "name": "차트 분석가", "code": "chart"}
+        }
+
+        discussion_log = []
+
+        # 롤링 토론 맥락: 토큰 예산을 넘으면 오래된 발언을 누적 요약으로 대체해 프롬프트 증가를 억제합니다.
+        async def condense(previous_summary, new_history):
+            return await self._run_with_retry(
+                self.moderator_agent.acondense_history, refined_name, previous_summary, new_history)
+
+        debate_context = DebateContext(condense)
+
+        # ------------------------------------------------------------------
+        # [Step 3] 전문가 기조 발언 (Opening)
+        # ------------------------------------------------------------------
+        opening_log = {
+            "speaker": "사회자", "code": "moderator",
+            "message": "지금부터 토론을 시작합니다. 각 전문가는 분석 결과를 발표해주세요.",
+            "type": "opening"
+        }
+        discussion_log.append(opening_log)
+
+        yield create_msg("system", "status", "전문가들이 지식 베이스를 바탕으로 분석을 시작합니다.")
+
+        # 세 에이전트의 RAG 검색을 모아 쿼리 임베딩 1회 + 벡터 검색 동시 수행으로 미리 채웁니다.
+        await retrieval_cache.awarm([
+            request for info in agent_map.values()
+            for request in info["instance"].retrieval_requests(refined_name, pure_ticker)
+        ])
+
+        async def run_agent_analyze(tag, agent_info, debate_context=None):
+            # 에이전트 내부에서 RAG 검색을 수행하므로 ticker 정보만 넘깁니다.
+            res = await self._run_with_retry(
+                agent_info["instance"].aanalyze, refined_name, pure_ticker,
+                debate_context=debate_context, debug=debate_context is None
+            )
+            return tag, res
+
+        opening_tasks = [
+            run_agent_analyze("Finance", agent_map["Finance"]),
+            run_agent_analyze("News", agent_map["News"]),
+            run_agent_analyze("Chart", agent_map["Chart"])
+        ]
+
+        for completed_task in asyncio.as_completed(opening_tasks):
+            tag, stmt = await completed_task
+            info = agent_map[tag]
+            if tag == "Chart":
+                yield create_msg("chart", "status", "기술적 지표 분석 완료. 추세를 확인했습니다.")
+            elif tag == "News":
+                yield create_msg("news", "status", "시장 심리 및 뉴스 분석 완료. 트렌드를 파악했습니다.")
+            elif tag == "Finance":
+                yield create_msg("finance", "status", "기업 가치 및 재무 건전성 평가를 마쳤습니다.")
+
+            yield create_msg(info["code"], "debate", stmt)
+            discussion_log.append({"speaker": info["name"], "code": info["code"], "message": stmt, "type": "opening"})
+
+        # 다음 단계(사회자 호출) 전 속도 조절 - 정책에 따라 바로 진행하거나 예산이 찰 때까지 대기
+        await self.pacing.pause(upcoming=1)
+        # ------------------------------------------------------------------
+        # [Step 4] 상호 토론 (Reasoning)
+        # ------------------------------------------------------------------
+        yield create_msg("system", "status", "분석 내용을 바탕으로 상호 토론을 시작합니다.")
+        for turn in range(max_turns):
+            yield create_msg("system", "status", f"상호 토론 {turn +1}/{max_turns} 라운드")
+
+            # [추가 부분] 7라운드 이상 시 사회자의 Temperature를 낮춰 수렴 유도
+            if turn >= 7:
+                self.moderator_agent.llm = self.moderator_llm.bind(temperature=0.1)
+
+
+            current_context = await debate_context.render(discussion_log, purpose=f"round{turn + 1}")
+
+            mod_output = await self._run_with_retry(
+                self.moderator_agent.afacilitate, refined_name, current_context,
+                multi=(self.debate_schedule == "parallel")
+            )
+
+            # 사회자 판단 파싱
+            terminate, assignments = self._parse_moderator_output(mod_output, agent_map)
+            if terminate:
+                yield create_msg("system", "status", "사회자가 토론 종료를 선언했습니다.")
+                break
+
+            # 이번 라운드에 지목된 전문가들의 반박은 동시에 실행하고, 끝나는 순서대로 전달합니다.
+            rebuttal_tasks = []
+            for target_key, inst_text in assignments:
+                yield create_msg("moderator", "debate", inst_text)
+                discussion_log.append({"speaker": "사회자", "code": "moderator", "message": inst_text, "type": "instruction"})
+
+                if target_key:
+                    target = agent_map[target_key]
+                    yield create_msg(target['code'], "status", f"{target['name']}가 반박 의견을 제시합니다.")
+                    rebuttal_tasks.append(run_agent_analyze(
+                        target_key, target,
+                        debate_context=f"[사회자 지시]: {inst_text}\n\n[이전 토론 맥락]: {current_context}"
+                    ))
+
+            for completed_task in asyncio.as_completed(rebuttal_tasks):
+                tag, rebuttal = await completed_task
+                target = agent_map[tag]
+                yield create_msg(target["code"], "debate", rebuttal)
+                discussion_log.append({"speaker": target["name"], "code": target["code"], "message": rebuttal, "type": "rebuttal"})
+            if rebuttal_tasks:
+                await self.pacing.pause(upcoming=1)
+        # ------------------------------------------------------------------
+        # [Step 5] 최후 변론 (Closing)
+        # ------------------------------------------------------------------
+        yield create_msg("system", "status", "최후 변론을 진행합니다.")
+        closing_msg = {"speaker": "사회자", "code": "moderator", "message": "토론을 마치겠습니다. 최후 변론을 해주세요.",
+                       "type": "closing"}
+        discussion_log.append(closing_msg)
+        current_context = await debate_context.render(discussion_log, purpose="closing")
+
+        closing_context_prompt = f"""
+            {current_context}
+            --- [SYSTEM INSTRUCTION] ---
+            지금까지의 토론 흐름을 참고하여, '최후 변론'을 하십시오.
+            """
+
+        # 세 전문가의 최후 변론은 같은 맥락을 보고 독립적으로 작성되므로 동시에 실행합니다.
+        async def run_closing(tag):
+            res = await self._run_with_retry(
+                agent_map[tag]["instance"].aanalyze,
+                refined_name, ticker,
+                debate_context=closing_context_prompt
+            )
+            return tag, res
+
+        closing_tasks = [run_closing(role_name) for role_name in ["Chart", "News", "Finance"]]
+        for completed_task in asyncio.as_completed(closing_tasks):
+            tag, text = await completed_task
+            agent = agent_map[tag]
+            yield create_msg(agent['code'], "status", "최후 변론을 마쳤습니다.")
+            yield create_msg(agent["code"], "debate", text)
+            discussion_log.append(
+                {"speaker": agent["name"], "code": agent["code"], "message": text, "type": "closing"})
+
+        # 사회자 요약은 최후 변론까지 포함한 전체 토론을 정리하므로 변론이 모두 끝난 뒤에 수행합니다.
+        yield create_msg("system", "status", "사회자가 토론을 요약 중입니다.")
+        current_context = await debate_context.render(discussion_log, purpose="summary")
+        summary_text = await self._run_with_retry(self.moderator_agent.asummarize_debate, refined_name, current_context)
+        yield create_msg("moderator", "debate", summary_text)
+        discussion_log.append({
+            "speaker": "사회자",
+            "code": "moderator",
+            "message": summary_text,
+            "type": "summary"
+        })
+
+        # ------------------------------------------------------------------
+        # [Step 6] 요약 및 판결 (Finalize)
+        # ------------------------------------------------------------------
+        await self.pacing.pause(upcoming=2)
+        yield create_msg("system", "status", "최종 투자 의견 및 최종 리포트를 생성합니다.")
+
+        final_context = await debate_context.render(discussion_log, purpose="final")
+
+        # 판결과 리포트는 같은 맥락을 입력으로 받는 독립 작업이므로 동시에 실행하고,
+        # 판결이 먼저 끝나면 리포트를 기다리지 않고 바로 전달합니다.
+        judge_task = asyncio.create_task(
+            self._run_with_retry(self.judge_agent.aadjudicate, refined_name, final_context))
+        report_task = asyncio.create_task(
+            self._run_with_retry(self.report_agent.agenerate_report, refined_name, pure_ticker, final_context))
+        try:
+            decision = await judge_task
+            if not report_task.done():
+                yield create_msg("system", "status", "최종 판결이 나왔습니다. 리포트를 마무리하는 중입니다.",
+                                 data={"conclusion": decision})
+            report = await report_task
+        finally:
+            # 오류/연결 종료 시 남은 작업 정리
+            for task in (judge_task, report_task):
+                if not task.done():
+                    task.cancel()
+
+        # [최종 결과 전송]
+        result_data = {
+            "summary": report,
+            "conclusion": decision,
+            "discussion_log": discussion_log,
+            "context_usage": debate_context.stats(),
+            "retrieval_usage": retrieval_cache.stats(),
+        }
+        self._record_context_usage(debate_context)
+        self._record_retrieval_usage(retrieval_cache)
+        yield create_msg("system", "result", "토론이 완료되었습니다.", data=result_data)
 
 
 
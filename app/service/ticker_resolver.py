@@ -1,18 +1,132 @@
-from ..utils.ticker_utils import get_clean_ticker
+import threading
+from ..utils.ticker_utils import get_clean_ticker, ticker_manager, strip_suffixes, PUNCT_PATTERN
 from ..agents.ticker_agent import extract_company_name # 유저님이 작성하신 LLM 추출 함수
 
+# 자주 쓰는 줄임말/한글 표기 -> 티커 (상장 목록에 정식 명칭으로는 없는 표현들)
+TICKER_ALIASES = {
+    # 한국
+    "삼전": "005930",
+    "하닉": "000660", "하이닉스": "000660",
+    "엘전": "066570", "엘지전자": "066570",
+    "엘솔": "373220", "엘지에너지솔루션": "373220", "엔솔": "373220",
+    "현차": "005380", "현대차": "005380",
+    "기아차": "000270",
+    "셀트": "068270",
+    "삼바": "207940", "삼성바이오": "207940",
+    "카뱅": "323410",
+    "포스코": "005490",
+    # 미국
+    "애플": "AAPL", "엔비디아": "NVDA", "테슬라": "TSLA",
+    "마소": "MSFT", "마이크로소프트": "MSFT",
+    "구글": "GOOGL", "알파벳": "GOOGL",
+    "아마존": "AMZN", "메타": "META", "페이스북": "META",
+    "넷플릭스": "NFLX", "쿠팡": "CPNG", "팔란티어": "PLTR",
+    "브로드컴": "AVGO", "인텔": "INTC",
+}
+
+class TickerPreResolver:
+    """
+    LLM 추출기(ticker_agent) 앞단의 결정적(deterministic) 종목 식별기.
+    - 6자리 종목코드(005930, 005930.KS), 상장 종목명 완전 일치, 줄임말 사전을 로컬에서 확인합니다.
+    - 상장 심볼은 입력 전체가 심볼 하나일 때만('AAPL') 인정합니다.
+      문장 속 영문 토큰은 'AI', 'IT', 'ON'처럼 일반 단어와 겹치는 심볼이 많아 LLM에 맡깁니다.
+    - 질문에서 서로 다른 종목이 두 개 이상 나오거나 아무것도 못 찾으면 None을 돌려 LLM에 맡깁니다.
+    """
+
+    def __init__(self, aliases=None):
+        self.aliases = dict(TICKER_ALIASES if aliases is None else aliases)
+        self._lock = threading.Lock()
+        self.fast_hits = 0
+        self.llm_fallbacks = 0
+
+    def _candidates(self, user_input):
+        text = PUNCT_PATTERN.sub(" ", user_input).strip()
+        if not text:
+            return []
+        candidates = [text]   # 'Apple Inc' 처럼 띄어쓰기가 있는 정식 명칭
+        for token in text.split():
+            candidates.append(token)
+            stripped = strip_suffixes(token)
+            if stripped != token:
+                candidates.append(stripped)
+        return candidates
+
+    def _match(self, token):
+        if token in self.aliases:
+            return self.aliases[token]
+        code = token.upper()
+        if code.endswith((".KS", ".KQ")):
+            code = code[:-3]
+        if code.isdigit() and len(code) == 6:
+            return code
+
+        info = ticker_manager.index.exact(token.upper())
+        if info is None:
+            return None
+        # 문장 속 토큰이 심볼 컬럼에서만 일치한 경우는 종목명 완전 일치가 아니므로 인정하지 않습니다.
+        if token.upper() == info['symbol'].upper():
+            return None
+        return info['symbol']
+
+    def _match_whole_symbol(self, user_input):
+        """입력 전체가 상장 심볼 하나뿐이면 그 심볼을 반환합니다."""
+        token = user_input.strip().upper()
+        info = ticker_manager.index.exact(token) if token else None
+        if info is not None and info['symbol'].upper() == token:
+            return info['symbol']
+        return None
+
+    def resolve(self, user_input: str):
+        """확실한 경우 심볼(005930, AAPL ...)을, 애매하면 None을 반환합니다."""
+        symbol = self._match_whole_symbol(user_input)
+        if symbol:
+            return symbol
+
+        matches = []
+        for candidate in self._candidates(user_input):
+            symbol = self._match(candidate)
+            if symbol and symbol not in matches:
+                matches.append(symbol)
+        return matches[0] if len(matches) == 1 else None
+
+    def record(self, fast_path: bool):
+        with self._lock:
+            if fast_path:
+                self.fast_hits += 1
+            else:
+                self.llm_fallbacks += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.fast_hits + self.llm_fallbacks
+            return {
+                "fast_path": self.fast_hits,
+                "llm_fallback": self.llm_fallbacks,
+                "fast_path_ratio": round(self.fast_hits / total, 3) if total else 0.0,
+            }
+
+
+# 프로세스 전역 사전 식별기
+ticker_pre_resolver = TickerPreResolver()
+
+
 def resolve_target_ticker(user_input: str):
     """
     ticker_agent으로 이름을 뽑고, Ticker_utils로 형식을 정리하는 통합 함수
     """
     print(f"🧐 분석 대상 식별 중: '{user_input}'")
-    
+
+    # 0. 확실한 입력(종목코드, 심볼, 정식 명칭, 줄임말)은 LLM 없이 바로 식별
+    raw_ticker = ticker_pre_resolver.resolve(user_input)
+    ticker_pre_resolver.record(raw_ticker is not None)
+
     # 1. ticker_agent을 통해 질문에서 티커/종목명 추출 (005930 또는 삼성전자 등)
-    raw_ticker = extract_company_name(user_input)
-    
+    if raw_ticker is None:
+        raw_ticker = extract_company_name(user_input)
+
     if raw_ticker == "NONE":
         raise ValueError("분석 대상을 찾을 수 없습니다. 종목명을 정확히 입력해 주세요.")
-    
+
     # 2. Ticker_utils를 통해 표준화된 티커로 변환 (005930.KS 등)
     try:
         clean_ticker = get_clean_ticker(raw_ticker)
@@ -20,4 +134,4 @@ def resolve_target_ticker(user_input: str):
         return clean_ticker
     except Exception as e:
         # Ticker_utils가 못 찾아도 LLM이 준 값을 믿고 한 번 더 시도
-        return raw_ticker
\ No newline at end of file
+        return raw_ticker
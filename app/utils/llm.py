@@ -1,20 +1,161 @@
 import os
+import asyncio
+import threading
+import httpx
+from importlib.metadata import PackageNotFoundError, version
 from dotenv import load_dotenv
-from langchain_upstage import ChatUpstage
+from langchain_upstage import ChatUpstage, UpstageEmbeddings
+from app.utils.rate_limiter import upstage_rate_limiter, token_usage_callback
 
 # .env 파일에 저장된 API 키를 환경 변수로 로드합니다.
 load_dotenv()
 
+# ----------------------------------------------------------------------
+# 클라이언트 레지스트리
+# 같은 모델 + 파라미터 조합은 프로세스 전체에서 하나의 인스턴스를 공유합니다.
+# 모든 인스턴스가 하나의 httpx 커넥션 풀(keep-alive)을 쓰므로 요청마다 TLS 핸드셰이크가 일어나지 않습니다.
+# ----------------------------------------------------------------------
+_registry_lock = threading.Lock()
+_chat_clients = {}
+_embedding_clients = {}
+_http_clients = {}
 
-def get_solar_model():
+
+def _get_api_key():
     api_key = os.getenv("UPSTAGE_API_KEY")
 
     if not api_key:
         # 키가 없을 경우 에러를 발생시켜 미리 알려줍니다.
         raise ValueError("UPSTAGE_API_KEY가 .env 파일에 설정되어 있지 않습니다. 확인해주세요!")
+    return api_key
+
+
+def _get_http_clients():
+    """Upstage API 전용 공유 커넥션 풀 (동기/비동기 각 1개)"""
+    if not _http_clients:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("UPSTAGE_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.getenv("UPSTAGE_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=60,
+        )
+        _http_clients["sync"] = httpx.Client(limits=limits)
+        _http_clients["async"] = httpx.AsyncClient(limits=limits)
+    return _http_clients["sync"], _http_clients["async"]
+
+
+def _registry_key(model, params):
+    return (model, tuple(sorted(params.items())))
+
+
+def get_solar_model(model="solar-pro2", **params):
+    """
+    공유 ChatUpstage 인스턴스를 반환합니다.
+    params: temperature 등 모델 생성 파라미터 (조합별로 인스턴스가 하나씩 만들어집니다)
+    """
+    key = _registry_key(model, params)
+    client = _chat_clients.get(key)
+    if client is not None:
+        return client
+
+    with _registry_lock:
+        if key not in _chat_clients:
+            http_client, http_async_client = _get_http_clients()
+            # Solar 모델 설정을 반환합니다.
+            # 모든 호출은 전역 rate limiter를 거치고, 응답 토큰 사용량이 토큰 예산에 반영됩니다.
+            _chat_clients[key] = ChatUpstage(
+                api_key=_get_api_key(),
+                model=model,
+                rate_limiter=upstage_rate_limiter,
+                callbacks=[token_usage_callback],
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **params,
+            )
+        return _chat_clients[key]
+
+
+def get_embedding_model(model="embedding-query"):
+    """공유 UpstageEmbeddings 인스턴스를 반환합니다."""
+    client = _embedding_clients.get(model)
+    if client is not None:
+        return client
+
+    with _registry_lock:
+        if model not in _embedding_clients:
+            http_client, http_async_client = _get_http_clients()
+            _embedding_clients[model] = UpstageEmbeddings(
+                api_key=_get_api_key(),
+                model=model,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        return _embedding_clients[model]
+
+
+def _langchain_upstage_version():
+    try:
+        return version("langchain-upstage")
+    except PackageNotFoundError:
+        return ""
+
+
+# 쿼리 일괄 임베딩은 공개 API가 없어 UpstageEmbeddings 내부(_invocation_params, client)를 사용합니다.
+# 내부 구조를 확인한 버전(0.7.x)에서만 쓰고, 그 외 버전은 공개 API(embed_query)로 쿼리마다 호출합니다.
+_QUERY_BATCH_VERSIONS = ("0.7.",)
+_query_batch_supported = _langchain_upstage_version().startswith(_QUERY_BATCH_VERSIONS)
+
+
+def _can_batch_queries(embeddings, client_attr):
+    return (
+        _query_batch_supported
+        and isinstance(embeddings, UpstageEmbeddings)
+        and hasattr(embeddings, "_invocation_params")
+        and getattr(embeddings, client_attr, None) is not None
+    )
+
+
+def _query_params(embeddings):
+    # embed_query와 같은 쿼리용 모델 (<모델명>-query)
+    params = embeddings._invocation_params
+    params["model"] = params["model"] + "-query"
+    return params
+
+
+def _check_count(vectors, texts):
+    if len(vectors) != len(texts):
+        raise ValueError(f"쿼리 임베딩 개수 불일치: 요청 {len(texts)}개, 응답 {len(vectors)}개")
+    return vectors
+
+
+def embed_queries(embeddings, texts):
+    """
+    여러 검색 쿼리를 한 번의 API 호출로 임베딩합니다. (embed_query와 같은 쿼리용 모델 사용)
+    일괄 호출을 지원하지 않는 환경(다른 임베딩 클래스, 확인되지 않은 langchain-upstage 버전)에서는
+    쿼리마다 embed_query를 호출합니다.
+    """
+    if not texts:
+        return []
+    if not _can_batch_queries(embeddings, "client"):
+        return [embeddings.embed_query(text) for text in texts]
+
+    params = _query_params(embeddings)
+    vectors = []
+    for i in range(0, len(texts), embeddings.embed_batch_size):
+        response = embeddings.client.create(input=list(texts[i:i + embeddings.embed_batch_size]), **params)
+        vectors.extend(r.embedding for r in response.data)
+    return _check_count(vectors, texts)
+
+
+async def aembed_queries(embeddings, texts):
+    """embed_queries의 비동기 버전"""
+    if not texts:
+        return []
+    if not _can_batch_queries(embeddings, "async_client"):
+        return list(await asyncio.gather(*[embeddings.aembed_query(text) for text in texts]))
 
-    # Solar 모델 설정을 반환합니다.
-    return ChatUpstage(
-        api_key=api_key,
-        model="solar-pro2"
-    )
\ No newline at end of file
+    params = _query_params(embeddings)
+    vectors = []
+    for i in range(0, len(texts), embeddings.embed_batch_size):
+        response = await embeddings.async_client.create(input=list(texts[i:i + embeddings.embed_batch_size]), **params)
+        vectors.extend(r.embedding for r in response.data)
+    return _check_count(vectors, texts)
@@ -0,0 +1,72 @@
+# app/utils/pacing.py
+
+import os
+import asyncio
+from dotenv import load_dotenv
+from app.utils.rate_limiter import upstage_rate_limiter
+
+load_dotenv()
+
+
+class NoPacing:
+    """단계 사이에 쉬지 않습니다. (호출 속도는 rate limiter가 알아서 조절)"""
+
+    name = "none"
+
+    def __init__(self):
+        self.paused_seconds = 0.0
+
+    async def pause(self, upcoming=1):
+        return 0.0
+
+    def stats(self):
+        return {"policy": self.name, "paused_seconds": round(self.paused_seconds, 2)}
+
+
+class FixedPacing(NoPacing):
+    """단계마다 고정 시간만큼 쉽니다. (기존 asyncio.sleep(2) 동작)"""
+
+    name = "fixed"
+
+    def __init__(self, seconds=2.0):
+        super().__init__()
+        self.seconds = seconds
+
+    async def pause(self, upcoming=1):
+        await asyncio.sleep(self.seconds)
+        self.paused_seconds += self.seconds
+        return self.seconds
+
+
+class QuotaAwarePacing(NoPacing):
+    """
+    다음 단계에서 보낼 호출 수(upcoming)만큼 rate limiter 예산이 남아 있으면 바로 진행하고,
+    부족할 때만 예산이 찰 때까지 기다립니다. (최대 max_seconds)
+    """
+
+    name = "quota"
+
+    def __init__(self, limiter, max_seconds=10.0):
+        super().__init__()
+        self.limiter = limiter
+        self.max_seconds = max_seconds
+
+    async def pause(self, upcoming=1):
+        wait = min(self.max_seconds, await self.limiter.await_estimate(upcoming))
+        if wait > 0:
+            await asyncio.sleep(wait)
+            self.paused_seconds += wait
+        return wait
+
+
+def pacing_from_env():
+    """DEBATE_PACING: none / fixed / quota (기본값 quota)"""
+    policy = os.getenv("DEBATE_PACING", "quota").lower()
+    seconds = float(os.getenv("DEBATE_PACING_SECONDS", 2.0))
+    if policy == "none":
+        return NoPacing()
+    if policy == "fixed":
+        return FixedPacing(seconds)
+    if policy == "quota":
+        return QuotaAwarePacing(upstage_rate_limiter, max_seconds=float(os.getenv("DEBATE_PACING_MAX_SECONDS", 10.0)))
+    raise ValueError(f"지원하지 않는 DEBATE_PACING 입니다: {policy} (none / fixed / quota)")
@@ -0,0 +1,68 @@
+# app/utils/query_cache.py
+
+import time
+import sqlite3
+import threading
+
+
+class QueryCache:
+    """
+    정규화된 질문 -> LLM 추출 결과를 보관하는 TTL 캐시 (SQLite 파일이라 재시작 후에도 유지)
+    - ttl_seconds가 지난 항목은 없는 것으로 취급합니다.
+    - max_entries를 넘으면 가장 오래된 항목부터 지웁니다.
+    """
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_cache_created ON query_cache (created)")
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM query_cache WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            # 만료 항목과 용량 초과분 정리
+            self._conn.execute("DELETE FROM query_cache WHERE created <= ?", (time.time() - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM query_cache WHERE key IN ("
+                " SELECT key FROM query_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
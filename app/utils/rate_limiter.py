@@ -0,0 +1,332 @@
+# app/utils/rate_limiter.py
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+
+class _LocalState:
+    """프로세스 내부 공유 상태 (기본값)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    @contextmanager
+    def open(self):
+        with self._lock:
+            yield self._data
+
+
+class _FileState:
+    """
+    여러 uvicorn 워커가 하나의 예산을 나눠 쓰도록 파일에 상태를 보관합니다. (Redis 불필요)
+    fcntl 파일 락으로 read-modify-write를 직렬화합니다. (fcntl이 없는 Windows에서는 사용할 수 없습니다)
+    """
+
+    def __init__(self, path):
+        import fcntl   # Windows에서는 ImportError -> UpstageRateLimiter가 프로세스 내부 상태로 대체
+        self._fcntl = fcntl
+        self._path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self):
+        with self._lock, open(self._path, "a+", encoding="utf-8") as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                data = json.loads(raw) if raw else {}
+                yield data
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(data))
+                f.flush()
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+
+class UpstageRateLimiter(BaseRateLimiter):
+    """
+    Upstage API 호출용 전역 토큰 버킷 (분당 요청 수 + 분당 토큰 수)
+
+    - 요청 버킷: 호출 직전에 1개를 소비합니다.
+    - 토큰 버킷: 호출이 끝난 뒤 실제 사용량(usage)만큼 차감합니다. 잔고가 음수인 동안 새 호출은 대기합니다.
+    - 429 응답을 받으면 Retry-After 만큼 모든 호출을 함께 멈춰(cooldown) 동시 재시도 폭주를 막습니다.
+    budget 값이 0이면 해당 제한은 적용하지 않습니다.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, burst=None, state_file=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # 한 번에 몰아서 보낼 수 있는 최대 요청 수 (기본: 10초 분량)
+        self.burst = burst or max(1, requests_per_minute // 6)
+        self._state = self._create_state(state_file)
+        # 파일 상태는 락 대기와 파일 I/O가 있으므로 비동기 경로에서는 스레드에서 처리합니다.
+        self._shared = isinstance(self._state, _FileState)
+
+        self._metrics_lock = threading.Lock()
+        self.waiting = 0           # 현재 대기 중인 호출 수 (queue depth)
+        self.max_waiting = 0
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+        self.tokens_used = 0
+        self.throttled = 0         # 429 응답 수
+
+    @staticmethod
+    def _create_state(state_file):
+        if not state_file:
+            return _LocalState()
+        try:
+            return _FileState(state_file)
+        except ImportError:
+            print("⚠️ 이 OS에서는 파일 락(fcntl)을 쓸 수 없어 UPSTAGE_RATE_LIMIT_FILE을 무시합니다. "
+                  "호출 제한은 워커(프로세스)별로 따로 적용됩니다.")
+            return _LocalState()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            requests_per_minute=int(os.getenv("UPSTAGE_RPM", 0)),
+            tokens_per_minute=int(os.getenv("UPSTAGE_TPM", 0)),
+            burst=int(os.getenv("UPSTAGE_RPM_BURST", 0)) or None,
+            state_file=os.getenv("UPSTAGE_RATE_LIMIT_FILE") or None,
+        )
+
+    # ------------------------------------------------------------------
+    # 버킷 계산
+    # ------------------------------------------------------------------
+    def _refill(self, state, now):
+        last = state.get("updated", now)
+        elapsed = max(0.0, now - last)
+        state["updated"] = now
+        if self.requests_per_minute:
+            state["requests"] = min(
+                self.burst,
+                state.get("requests", self.burst) + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute:
+            state["tokens"] = min(
+                self.tokens_per_minute,
+                state.get("tokens", self.tokens_per_minute) + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _try_acquire(self):
+        """획득에 성공하면 0을, 실패하면 다시 시도하기까지 기다릴 시간(초)을 반환합니다."""
+        now = time.time()
+        with self._state.open() as state:
+            self._refill(state, now)
+
+            waits = [state.get("blocked_until", 0) - now]
+            if self.requests_per_minute and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and state["tokens"] < 0:
+                waits.append(-state["tokens"] * 60 / self.tokens_per_minute)
+
+            wait = max(waits)
+            if wait > 0:
+                return wait
+
+            if self.requests_per_minute:
+                state["requests"] -= 1
+            return 0.0
+
+    def _on_wait_start(self):
+        with self._metrics_lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def _on_wait_end(self, started, acquired):
+        with self._metrics_lock:
+            self.waiting -= 1
+            # 비차단(blocking=False) 시도가 실패한 경우는 획득으로 세지 않습니다.
+            if acquired:
+                self.acquired += 1
+                self.total_wait_seconds += time.time() - started
+
+    # ------------------------------------------------------------------
+    # BaseRateLimiter 인터페이스 (ChatUpstage가 호출 직전에 사용)
+    # ------------------------------------------------------------------
+    def acquire(self, *, blocking: bool = True) -> bool:
+        started = time.time()
+        acquired = False
+        self._on_wait_start()
+        try:
+            while True:
+                wait = self._try_acquire()
+                if wait <= 0:
+                    acquired = True
+                    return True
+                if not blocking:
+                    return False
+                time.sleep(wait + random.uniform(0, 0.05))
+        finally:
+            self._on_wait_end(started, acquired)
+
+    async def _offload(self, func, *args):
+        """파일 상태(락 대기 + 파일 I/O)는 스레드에서, 프로세스 내부 상태는 바로 처리합니다."""
+        if self._shared:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        started = time.time()
+        acquired = False
+        self._on_wait_start()
+        try:
+            while True:
+                wait = await self._offload(self._try_acquire)
+                if wait <= 0:
+                    acquired = True
+                    return True
+                if not blocking:
+                    return False
+                await asyncio.sleep(wait + random.uniform(0, 0.05))
+        finally:
+            self._on_wait_end(started, acquired)
+
+    # ------------------------------------------------------------------
+    # 사용량 반영 / 429 처리
+    # ------------------------------------------------------------------
+    def record_tokens(self, tokens):
+        if not tokens:
+            return
+        with self._metrics_lock:
+            self.tokens_used += tokens
+        if self.tokens_per_minute:
+            with self._state.open() as state:
+                self._refill(state, time.time())
+                state["tokens"] -= tokens
+
+    async def arecord_tokens(self, tokens):
+        """record_tokens의 비동기 버전"""
+        await self._offload(self.record_tokens, tokens)
+
+    def block_for(self, seconds):
+        """429 이후 모든 호출을 seconds 동안 멈춥니다. (워커 간 공유)"""
+        with self._metrics_lock:
+            self.throttled += 1
+        with self._state.open() as state:
+            state["blocked_until"] = max(state.get("blocked_until", 0), time.time() + seconds)
+
+    async def ablock_for(self, seconds):
+        """block_for의 비동기 버전"""
+        await self._offload(self.block_for, seconds)
+
+    def wait_estimate(self, requests=1):
+        """지금부터 requests개의 호출을 바로 보낼 수 있을 때까지 남은 시간(초). 버킷은 소비하지 않습니다."""
+        now = time.time()
+        with self._state.open() as state:
+            self._refill(state, now)
+            waits = [state.get("blocked_until", 0) - now]
+            if self.requests_per_minute:
+                missing = min(requests, self.burst) - state["requests"]
+                waits.append(missing * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and state["tokens"] < 0:
+                waits.append(-state["tokens"] * 60 / self.tokens_per_minute)
+        return max(0.0, max(waits))
+
+    async def await_estimate(self, requests=1):
+        """wait_estimate의 비동기 버전"""
+        return await self._offload(self.wait_estimate, requests)
+
+    def stats(self):
+        with self._metrics_lock:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "queue_depth": self.waiting,
+                "max_queue_depth": self.max_waiting,
+                "acquired": self.acquired,
+                "avg_wait_seconds": round(self.total_wait_seconds / self.acquired, 3) if self.acquired else 0.0,
+                "tokens_used": self.tokens_used,
+                "throttled_429": self.throttled,
+            }
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LLM 응답의 토큰 사용량을 rate limiter의 토큰 버킷에 반영합니다."""
+
+    # 비동기 호출(ainvoke)에서는 LangChain이 인라인이 아닌 동기 핸들러를 executor 스레드에서 실행하므로
+    # 파일 상태를 쓰는 record_tokens가 이벤트 루프를 막지 않습니다.
+    run_inline = False
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        total = usage.get("total_tokens")
+        if total is None:
+            # llm_output이 없으면 메시지의 usage_metadata에서 합산
+            total = 0
+            for generations in response.generations:
+                for gen in generations:
+                    metadata = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    total += metadata.get("total_tokens", 0)
+        self.limiter.record_tokens(total)
+
+
+# ----------------------------------------------------------------------
+# 재시도 (지터가 섞인 지수 백오프 + Retry-After 준수)
+# ----------------------------------------------------------------------
+BACKOFF_BASE = float(os.getenv("UPSTAGE_BACKOFF_BASE", 2.0))
+BACKOFF_MAX = float(os.getenv("UPSTAGE_BACKOFF_MAX", 60.0))
+
+
+def is_rate_limit_error(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    return "429" in str(error) or "too_many_requests" in str(error)
+
+
+def retry_after_seconds(error):
+    """응답 헤더의 Retry-After(초) / retry-after-ms 값을 읽습니다. 없으면 None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Retry-After가 있으면 그 값을, 없으면 full-jitter 지수 백오프 값을 사용합니다."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def acall_with_backoff(func, *args, max_retries=5, **kwargs):
+    """429 발생 시 전역 cooldown을 건 뒤 백오프 후 재시도하는 비동기 호출 래퍼"""
+    for attempt in range(max_retries):
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries - 1:
+                raise
+            retry_after = retry_after_seconds(e)
+            wait_time = backoff_delay(attempt, retry_after)
+            # Retry-After가 있으면 모든 호출이 함께 쉬도록 전역 cooldown 설정
+            await upstage_rate_limiter.ablock_for(retry_after or 0)
+            print(f"⚠️ API 호출 제한(429) 감지. {wait_time:.1f}초 대기 후 재시도합니다. ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(wait_time)
+
+
+# 모든 get_solar_model() 소비자가 공유하는 프로세스 전역 리미터
+upstage_rate_limiter = UpstageRateLimiter.from_env()
+token_usage_callback = TokenUsageCallback(upstage_rate_limiter)
@@ -1,81 +1,412 @@
 import FinanceDataReader as fdr
+import numpy as np
 import pandas as pd
 import os
+import re
+import json
 import time
+import shutil
+import hashlib
+import threading
 from pathlib import Path
 
+# 한글 초성 (가~힣 음절을 19개 초성으로 분해)
+CHOSUNG = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ',
+           'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+_CHOSUNG_SET = set(CHOSUNG)
+
+
+def to_chosung(text: str) -> str:
+    """'삼성전자' -> 'ㅅㅅㅈㅈ' (한글 음절이 아닌 문자는 그대로 둡니다)"""
+    return "".join(
+        CHOSUNG[(ord(ch) - 0xAC00) // 588] if '가' <= ch <= '힣' else ch
+        for ch in text
+    )
+
+
+def is_chosung_query(text: str) -> bool:
+    return bool(text) and all(ch in _CHOSUNG_SET for ch in text)
+
+
+# 토큰 끝에 붙는 조사/수식어 (긴 것부터 제거)
+_SUFFIXES = sorted([
+    "이랑", "에서", "으로", "에게", "한테", "까지", "부터", "은", "는", "이", "가",
+    "을", "를", "의", "에", "도", "랑", "로", "와", "과", "주가", "주식", "종목",
+], key=len, reverse=True)
+PUNCT_PATTERN = re.compile(r"[^\w\s.&-]")
+
+
+def strip_suffixes(token: str) -> str:
+    """'삼성전자는' -> '삼성전자', '카카오주가' -> '카카오' (남는 글자가 없으면 원래 토큰 유지)"""
+    changed = True
+    while changed:
+        changed = False
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) > len(suffix):
+                token = token[:-len(suffix)]
+                changed = True
+                break
+    return token
+
+
+def normalize_query(text: str) -> str:
+    """
+    캐시 키용 질문 정규화: 구두점 제거, 소문자화, 공백 정리, 토큰별 조사 제거
+    ('카카오는 어때?' / '카카오 어때' -> '카카오 어때')
+    """
+    tokens = PUNCT_PATTERN.sub(" ", text).lower().split()
+    return " ".join(strip_suffixes(token) for token in tokens)
+
+
+class _SubstringIndex:
+    """
+    부분 문자열 검색용 n-gram(1·2글자) 역색인.
+    가장 드문 n-gram을 가진 항목만 실제 포함 여부를 확인하므로 전체 목록을 훑지 않습니다.
+    여러 개가 일치하면 항상 등록 순서가 가장 빠른 항목을 돌려줍니다. (결정적)
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.grams = {}
+        for idx, text in enumerate(texts):
+            if not text:
+                continue
+            for gram in self._ngrams(text):
+                self.grams.setdefault(gram, []).append(idx)
+
+    @staticmethod
+    def _ngrams(text):
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def find(self, query):
+        """query를 포함하는 첫 번째 항목의 인덱스 (없으면 None)"""
+        if not query:
+            return None
+        query_grams = [query[i:i + 2] for i in range(len(query) - 1)] or [query]
+        postings = []
+        for gram in set(query_grams):
+            posting = self.grams.get(gram)
+            if not posting:
+                return None
+            postings.append(posting)
+
+        # 가장 짧은 목록만 등록 순서대로 검증합니다. (목록이 오름차순이라 첫 일치가 곧 정답)
+        for idx in min(postings, key=len):
+            if query in self.texts[idx]:
+                return idx
+        return None
+
+
+def _key_hash(key: str) -> int:
+    """프로세스와 무관하게 항상 같은 값을 내는 64비트 해시 (파일 색인용)"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class TickerTable:
+    """
+    종목 목록을 컬럼 단위 배열로 보관합니다. (한 종목 = 한 행)
+    - symbols / names: 고정 길이 유니코드 배열
+    - market_codes: 시장 이름을 정수 코드로 바꾼 배열 (markets 목록으로 복원)
+    - *_hashes / *_rows: 대문자 키 해시를 정렬한 배열과 해당 행 번호 (이진 탐색용 해시 색인)
+    모든 배열은 .npy 파일로 저장되고 np.load(mmap_mode='r')로 열리므로
+    여러 워커 프로세스가 같은 파일을 페이지 캐시로 공유합니다.
+    """
+
+    COLUMNS = ["symbols", "names", "market_codes",
+               "symbol_hashes", "symbol_rows", "name_hashes", "name_rows"]
+
+    def __init__(self, markets, **columns):
+        self.markets = markets
+        for column in self.COLUMNS:
+            setattr(self, column, columns[column])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @staticmethod
+    def _hash_index(keys):
+        hashes = np.fromiter((_key_hash(k.upper()) for k in keys), dtype=np.uint64, count=len(keys))
+        rows = np.argsort(hashes, kind="stable").astype(np.int32)
+        return hashes[rows], rows
+
+    @classmethod
+    def from_frame(cls, df):
+        """df: symbol / name / market 컬럼을 가진 DataFrame (앞쪽 행이 검색 우선순위가 높습니다)"""
+        symbols = df['symbol'].astype(str).to_numpy(dtype=str)
+        names = df['name'].fillna("").astype(str).to_numpy(dtype=str)
+        # 시장 이름은 등장 순서대로 정수 코드로 바꿉니다. (KOSPI -> 0, KOSDAQ -> 1 ...)
+        market_codes, markets = pd.factorize(df['market'], sort=False)
+
+        symbol_hashes, symbol_rows = cls._hash_index(symbols.tolist())
+        name_hashes, name_rows = cls._hash_index(names.tolist())
+
+        return cls(
+            [str(m) for m in markets],
+            symbols=symbols,
+            names=names,
+            market_codes=market_codes.astype(np.uint8),
+            symbol_hashes=symbol_hashes,
+            symbol_rows=symbol_rows,
+            name_hashes=name_hashes,
+            name_rows=name_rows,
+        )
+
+    def save(self, cache_dir: Path):
+        """
+        새 버전 디렉터리에 배열을 쓴 뒤 CURRENT 포인터를 원자적으로 교체합니다.
+        (읽는 쪽은 항상 완성된 버전만 보게 됩니다.)
+        """
+        version = f"v{int(time.time() * 1000)}"
+        version_dir = cache_dir / version
+        version_dir.mkdir(parents=True, exist_ok=True)
+        for column in self.COLUMNS:
+            np.save(version_dir / f"{column}.npy", getattr(self, column))
+        with open(version_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"markets": self.markets, "rows": len(self)}, f, ensure_ascii=False)
+
+        pointer = cache_dir / "CURRENT.tmp"
+        pointer.write_text(version, encoding="utf-8")
+        os.replace(pointer, cache_dir / "CURRENT")
+
+        # 이전 버전은 하나만 남기고 정리 (이미 열어 둔 워커는 mmap이 살아 있어 안전)
+        versions = sorted(p for p in cache_dir.iterdir() if p.is_dir() and p.name != version)
+        for old in versions[:-1]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, cache_dir: Path):
+        version = (cache_dir / "CURRENT").read_text(encoding="utf-8").strip()
+        version_dir = cache_dir / version
+        with open(version_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {
+            column: np.load(version_dir / f"{column}.npy", mmap_mode="r")
+            for column in cls.COLUMNS
+        }
+        return cls(meta["markets"], **columns)
+
+    @staticmethod
+    def cache_age(cache_dir: Path):
+        """마지막 저장 이후 지난 시간(초). 캐시가 없으면 None"""
+        pointer = cache_dir / "CURRENT"
+        if not pointer.exists():
+            return None
+        return time.time() - pointer.stat().st_mtime
+
+
+class TickerIndex:
+    """
+    TickerTable 위에서 동작하는 검색 색인 (생성 후 변경하지 않음)
+    - 완전 일치 / 역방향 조회(심볼 -> 종목명): 저장된 해시 색인을 이진 탐색
+    - 부분 문자열 / 초성 검색: 처음 필요할 때 n-gram 색인을 만듭니다.
+    """
+
+    def __init__(self, table: TickerTable):
+        self.table = table
+        self._lock = threading.Lock()
+        self._substring = None
+        self._chosung = None
+
+    def __len__(self):
+        return len(self.table)
+
+    def _info(self, row):
+        row = int(row)
+        return {
+            'symbol': str(self.table.symbols[row]),
+            'market': self.table.markets[self.table.market_codes[row]],
+        }
+
+    @staticmethod
+    def _find_row(hashes, rows, column, key):
+        """해시 색인에서 key(대문자)와 일치하는 가장 앞 행 번호 (없으면 None)"""
+        h = np.uint64(_key_hash(key))
+        lo = int(np.searchsorted(hashes, h, side="left"))
+        hi = int(np.searchsorted(hashes, h, side="right"))
+        # 해시 충돌에 대비해 실제 값까지 확인합니다. (stable 정렬이라 행 번호 오름차순)
+        for row in rows[lo:hi]:
+            if str(column[row]).upper() == key:
+                return int(row)
+        return None
+
+    def _ensure_ngram_index(self):
+        if self._substring is not None:
+            return
+        with self._lock:
+            if self._substring is not None:
+                return
+            # 행마다 [심볼, 종목명] 순서로 펼칩니다. (n-gram 위치 // 2 = 행 번호)
+            keys = []
+            for symbol, name in zip(self.table.symbols.tolist(), self.table.names.tolist()):
+                keys.append(symbol.upper())
+                keys.append(name.upper())
+            # 한글 이름이 있는 항목만 초성 색인에 넣습니다.
+            self._chosung = _SubstringIndex([
+                to_chosung(key) if any('가' <= ch <= '힣' for ch in key) else ""
+                for key in keys
+            ])
+            self._substring = _SubstringIndex(keys)
+
+    def exact(self, query):
+        """심볼 또는 종목명 완전 일치만 확인합니다. (query는 대문자)"""
+        t = self.table
+        row = self._find_row(t.symbol_hashes, t.symbol_rows, t.symbols, query)
+        if row is None:
+            row = self._find_row(t.name_hashes, t.name_rows, t.names, query)
+        return self._info(row) if row is not None else None
+
+    def lookup(self, query):
+        """완전 일치 -> (초성 검색 | 부분 문자열 검색) 순서로 종목 정보를 찾습니다."""
+        info = self.exact(query)
+        if info is not None:
+            return info
+
+        self._ensure_ngram_index()
+        index = self._chosung if is_chosung_query(query) else self._substring
+        idx = index.find(query)
+        return self._info(idx // 2) if idx is not None else None
+
+    def get_name(self, symbol):
+        t = self.table
+        row = self._find_row(t.symbol_hashes, t.symbol_rows, t.symbols, symbol)
+        if row is None:
+            return None
+        return str(t.names[row]) or None
+
+
 class TickerManager:
     _instance = None
-    _ticker_map = {}
-    # 캐시 파일 경로 설정
-    CACHE_FILE = Path("tickers_cache.pkl")
+    _index = None
+    # 캐시 디렉터리 설정 (컬럼별 .npy + CURRENT 포인터)
+    CACHE_DIR = Path(os.getenv("TICKER_CACHE_DIR", "tickers_cache"))
     # 캐시 유지 시간 (예: 24시간)
     CACHE_EXPIRY = 24 * 60 * 60 
 
+    # 갱신 실패 시 다시 시도하기까지의 대기 시간
+    REFRESH_RETRY = 10 * 60
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(TickerManager, cls).__new__(cls)
-            cls._instance._initialize_data()
+            cls._instance._load_lock = threading.Lock()
+            cls._instance._loaded_at = 0.0
+            cls._instance._refreshing = False
         return cls._instance
 
+    @property
+    def index(self) -> TickerIndex:
+        """
+        처음 조회할 때 종목 데이터를 불러옵니다. (import 시점에는 아무것도 읽지 않음, 서버에서는 warm()으로 미리 로드)
+        데이터가 오래됐으면 기존 색인을 그대로 쓰면서 백그라운드에서 갱신합니다. (stale-while-revalidate)
+        """
+        if self._index is None:
+            with self._load_lock:
+                if self._index is None:
+                    self._initialize_data()
+        if time.time() - self._loaded_at >= self.CACHE_EXPIRY:
+            self._start_refresh()
+        return self._index
+
+    def warm(self):
+        """
+        서버 시작 시 호출합니다. 종목 데이터를 불러오고 부분 문자열/초성 색인까지 미리 만들어,
+        첫 요청이 콜드 스타트(다운로드 + 색인 생성)를 떠안지 않도록 합니다.
+        """
+        index = self.index
+        index._ensure_ngram_index()
+        return index
+
     def _initialize_data(self):
-        # 1. 캐시 파일이 존재하고 최신인지 확인
-        if self.CACHE_FILE.exists():
-            file_age = time.time() - self.CACHE_FILE.stat().st_mtime
-            if file_age < self.CACHE_EXPIRY:
-                print("💾 로컬 캐시에서 종목 데이터를 불러옵니다...")
-                self._ticker_map = pd.read_pickle(self.CACHE_FILE)
-                print(f"✅ 총 {len(self._ticker_map)}개의 매핑 포인트 로드 완료.")
+        # 1. 캐시 파일이 있으면 오래됐더라도 우선 불러옵니다. (갱신은 백그라운드에서)
+        age = TickerTable.cache_age(self.CACHE_DIR)
+        if age is not None:
+            print("💾 로컬 캐시에서 종목 데이터를 불러옵니다...")
+            self._index = TickerIndex(TickerTable.load(self.CACHE_DIR))
+            self._loaded_at = time.time() - age
+            print(f"✅ 총 {len(self._index)}개 종목 로드 완료.")
+            return
+
+        # 2. 캐시가 아예 없는 경우에만 요청을 멈추고 새로 다운로드
+        table = self._load_stock_data()
+        table.save(self.CACHE_DIR)
+        self._index = TickerIndex(table)
+        self._loaded_at = time.time()
+
+    def _start_refresh(self):
+        with self._load_lock:
+            if self._refreshing:
                 return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="ticker-refresh", daemon=True).start()
+
+    def _refresh(self):
+        """새 색인을 완성한 뒤 참조만 바꿔 끼웁니다. (진행 중인 조회는 이전 색인을 계속 사용)"""
+        try:
+            age = TickerTable.cache_age(self.CACHE_DIR)
+            if age is not None and age < self.CACHE_EXPIRY:
+                # 다른 워커가 이미 갱신해 둔 캐시가 있으면 다운로드 없이 불러옵니다.
+                table = TickerTable.load(self.CACHE_DIR)
+                loaded_at = time.time() - age
+            else:
+                table = self._load_stock_data()
+                table.save(self.CACHE_DIR)
+                loaded_at = time.time()
+
+            index = TickerIndex(table)
+            index._ensure_ngram_index()   # 교체 직후 첫 검색이 느려지지 않도록 미리 생성
+            self._index = index
+            self._loaded_at = loaded_at
+            print(f"🔄 종목 색인 교체 완료. (총 {len(index)}개 종목)")
+        except Exception as e:
+            # 실패해도 기존 색인을 그대로 쓰고, 잠시 뒤 다시 시도합니다.
+            print(f"⚠️ 종목 데이터 갱신 실패, 기존 색인을 유지합니다: {e}")
+            self._loaded_at = time.time() - self.CACHE_EXPIRY + self.REFRESH_RETRY
+        finally:
+            self._refreshing = False
 
-        # 2. 캐시가 없거나 오래된 경우에만 새로 다운로드
-        self._load_stock_data()
+    def _load_stock_data(self) -> TickerTable:
+        print("🌐 서버에서 글로벌 종목 데이터 동기화 중...")
+        frames = []
 
-    def _load_stock_data(self):
-        print("🌐 서버에서 글로벌 종목 데이터 동기화 중 (최초 1회)...")
-        new_map = {}
-        
         # 한국 시장 (KRX)
         df_krx = fdr.StockListing('KRX')
-        for _, row in df_krx.iterrows():
-            data = {'symbol': row['Code'], 'market': row['Market']}
-            new_map[row['Code']] = data
-            new_map[row['Name']] = data
-            
+        frames.append(pd.DataFrame({
+            'symbol': df_krx['Code'],
+            'name': df_krx['Name'],
+            'market': df_krx['Market'],
+        }))
+
         # 2. 미국 시장 확장 (AMEX 및 ETF/US 추가)
         # AMEX에는 TQQQ, SOXL 같은 파생 상품이 많이 포함되어 있습니다.
         for market in ['NASDAQ', 'NYSE', 'AMEX', 'ETF/US']:
             try:
                 df_us = fdr.StockListing(market)
-                for _, row in df_us.iterrows():
-                    # ETF/US 데이터는 컬럼명이 'Symbol'인 경우가 많습니다.
-                    symbol = row.get('Symbol', row.get('Code'))
-                    name = row.get('Name')
-                    
-                    if symbol:
-                        data = {'symbol': symbol, 'market': market}
-                        new_map[symbol] = data
-                        if name:
-                            new_map[name] = data
+                # ETF/US 데이터는 컬럼명이 'Symbol'인 경우가 많습니다.
+                symbol_col = 'Symbol' if 'Symbol' in df_us.columns else 'Code'
+                frames.append(pd.DataFrame({
+                    'symbol': df_us[symbol_col],
+                    'name': df_us['Name'] if 'Name' in df_us.columns else "",
+                    'market': market,
+                }))
             except Exception as e:
                 print(f"⚠️ {market} 데이터 로드 건너뜀: {e}")
 
-        # 결과 저장 및 파일 캐싱
-        self._ticker_map = new_map
-        pd.to_pickle(self._ticker_map, self.CACHE_FILE)
-        print(f"✅ 동기화 완료 및 캐시 저장됨. (총 {len(self._ticker_map)}개)")
+        df = pd.concat(frames, ignore_index=True)
+        df = df[df['symbol'].notna() & (df['symbol'].astype(str) != "")]
+
+        table = TickerTable.from_frame(df)
+        print(f"✅ 동기화 완료. (총 {len(table)}개 종목)")
+        return table
 
     def resolve(self, ticker_input: str) -> str:
         # 1. 입력값 정제 (공백 제거 및 대문자화)
         query = ticker_input.upper().strip()
-        info = self._ticker_map.get(query)
-        
-        # 2. 캐시맵에서 검색 (완전 일치 혹은 이름 포함 검색)
-        if not info:
-            for name, data in self._ticker_map.items():
-                if query in name:
-                    info = data
-                    break
+
+        # 2. 색인에서 검색 (완전 일치 혹은 이름 포함 / 초성 검색)
+        info = self.index.lookup(query)
+
         # 3. [핵심] 매핑 리스트에 없더라도 '티커 형식'이면 통과 (Smart Fallback)
         if not info:
             # 한국 주식 형식: 6자리 숫자 (예: 005930)
@@ -96,6 +427,10 @@ class TickerManager:
         if market in ['KOSDAQ', 'KONEX']: return f"{symbol}.KQ"
         return symbol
 
+    def get_name(self, symbol: str):
+        """심볼(005930, 005930.KS, AAPL)의 정식 종목명. 없으면 None"""
+        return self.index.get_name(symbol.split('.')[0].upper())
+
 # 싱글톤 인스턴스 및 함수 정의는 동일
 ticker_manager = TickerManager()
 def get_clean_ticker(ticker_input: str) -> str:
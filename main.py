@@ -1,6 +1,8 @@
 import os
 import time
+import asyncio
 import concurrent.futures
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -13,8 +15,20 @@ from app.core.database import engine, Base
 from app.api import auth, chat, history
 import app.models.user
 import app.models.history
+from app.utils.ticker_utils import ticker_manager
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 종목 색인을 첫 요청이 아니라 서버 시작 시 불러옵니다. (다운로드/색인 생성은 스레드에서)
+    try:
+        await asyncio.to_thread(ticker_manager.warm)
+    except Exception as e:
+        print(f"⚠️ 종목 색인 사전 로드 실패, 첫 요청 시 다시 시도합니다: {e}")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -0,0 +1,111 @@
+# tests/test_debate_context.py
+# 토론 맥락 토큰 예산/증분 요약 확인 (API 호출 없음): python -m pytest tests/test_debate_context.py 또는 python -m tests.test_debate_context
+
+import asyncio
+from unittest.mock import patch
+
+from app.service import debate_context
+from app.service.debate_context import DebateContext
+
+
+def _count_words(text):
+    # tiktoken 유무와 상관없이 같은 결과가 나오도록 단어 수를 토큰 수로 씁니다.
+    return len(text.split())
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []   # [(이전 요약, 새 기록), ...]
+
+    async def __call__(self, previous_summary, new_history):
+        self.calls.append((previous_summary, new_history))
+        return f"요약{len(self.calls)}"
+
+
+def _log(count, words=3, start=0):
+    return [{"speaker": f"S{i}", "message": " ".join(["w"] * words)} for i in range(start, start + count)]
+
+
+def _render(context, discussion_log, purpose="context"):
+    with patch.object(debate_context, "count_tokens", _count_words):
+        return asyncio.run(context.render(discussion_log, purpose=purpose))
+
+
+def test_under_budget_passes_through():
+    summarizer = FakeSummarizer()
+    context = DebateContext(summarizer, budget_tokens=100, keep_recent=2)
+    discussion_log = _log(3)
+
+    text = _render(context, discussion_log)
+    assert text == "".join(f"\n\n[{item['speaker']}]: {item['message']}" for item in discussion_log)
+    assert summarizer.calls == []
+    assert context.summarized_upto == 0
+
+
+def test_over_budget_summarizes_older_entries():
+    summarizer = FakeSummarizer()
+    # 항목당 4토큰 x 6개 = 24 > 예산 20 -> 앞의 4개는 요약, 최근 2개는 원문
+    context = DebateContext(summarizer, budget_tokens=20, keep_recent=2)
+    discussion_log = _log(6)
+
+    text = _render(context, discussion_log)
+    assert len(summarizer.calls) == 1
+    previous, new_history = summarizer.calls[0]
+    assert previous == ""
+    assert "[S0]" in new_history and "[S3]" in new_history and "[S4]" not in new_history
+    assert text.startswith("\n\n[이전 토론 요약]: 요약1")
+    assert "[S4]" in text and "[S5]" in text and "[S3]" not in text
+    assert context.summarized_upto == 4
+
+
+def test_incremental_summary():
+    summarizer = FakeSummarizer()
+    context = DebateContext(summarizer, budget_tokens=20, keep_recent=2)
+    discussion_log = _log(6)
+    _render(context, discussion_log)
+
+    # 새 항목이 없으면 요약을 다시 하지 않습니다.
+    _render(context, discussion_log)
+    assert len(summarizer.calls) == 1
+
+    # 새로 밀려난 항목(S4, S5)만 이전 요약에 덧붙입니다.
+    discussion_log += _log(2, start=6)
+    text = _render(context, discussion_log)
+    assert len(summarizer.calls) == 2
+    previous, new_history = summarizer.calls[1]
+    assert previous == "요약1"
+    assert "[S4]" in new_history and "[S5]" in new_history and "[S3]" not in new_history
+    assert context.summarized_upto == 6
+    assert "요약2" in text and "[S6]" in text and "[S7]" in text
+
+
+def test_keep_recent_shrinks_for_long_entries():
+    summarizer = FakeSummarizer()
+    # 항목당 8토큰: 최근 발언이 예산의 절반(10)을 넘지 않을 때까지 원문 개수를 줄입니다. (최소 1개)
+    context = DebateContext(summarizer, budget_tokens=20, keep_recent=4)
+    discussion_log = _log(4, words=7)
+
+    text = _render(context, discussion_log)
+    assert context.summarized_upto == 3
+    assert "[S3]" in text and "[S2]" not in text
+
+
+def test_stats():
+    context = DebateContext(FakeSummarizer(), budget_tokens=20, keep_recent=2)
+    _render(context, _log(2), purpose="round1")
+    _render(context, _log(6), purpose="round2")
+
+    stats = context.stats()
+    assert stats["budget_tokens"] == 20
+    assert stats["calls"] == 2
+    assert [purpose for purpose, _ in context.calls] == ["round1", "round2"]
+    assert stats["context_tokens_total"] == sum(tokens for _, tokens in context.calls)
+    assert stats["context_tokens_max"] == max(tokens for _, tokens in context.calls)
+    assert stats["summary_updates"] == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
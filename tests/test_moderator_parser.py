@@ -0,0 +1,57 @@
+# tests/test_moderator_parser.py
+# 사회자 응답 파싱 확인 (API 호출 없음): python -m pytest tests/test_moderator_parser.py 또는 python -m tests.test_moderator_parser
+
+from app.service.stock_service import StockService
+
+AGENT_MAP = {"Finance": {}, "News": {}, "Chart": {}}
+
+
+def _parse(text):
+    # 파서는 인스턴스 상태를 쓰지 않으므로 서비스 객체 없이 호출합니다.
+    return StockService._parse_moderator_output(None, text, AGENT_MAP)
+
+
+def test_terminate():
+    assert _parse("STATUS: [TERMINATE]\nINSTRUCTION_News: 무시되어야 함") == (True, [])
+    assert _parse("STATUS: TERMINATE") == (True, [])
+
+
+def test_parallel_instructions():
+    text = (
+        "STATUS: [CONTINUE]\n"
+        "INSTRUCTION_News: 뉴스 관점에서 재무 분석가의 주장을 반박하세요.\n"
+        "INSTRUCTION_chart: 지지선 근거를 보강하세요."
+    )
+    terminate, assignments = _parse(text)
+    assert terminate is False
+    assert assignments == [
+        ("News", "뉴스 관점에서 재무 분석가의 주장을 반박하세요."),
+        ("Chart", "지지선 근거를 보강하세요."),
+    ]
+
+
+def test_parallel_instructions_keep_first_per_speaker():
+    text = "INSTRUCTION_News: 첫 번째 지시\nINSTRUCTION_News: 두 번째 지시\nINSTRUCTION_Finance:   "
+    # 같은 발언자는 첫 지시만, 빈 지시는 버립니다.
+    assert _parse(text) == (False, [("News", "첫 번째 지시")])
+
+
+def test_single_speaker_format():
+    text = "STATUS: [CONTINUE]\nNEXT_SPEAKER: [Finance]\nINSTRUCTION: 부채비율을 다시 설명하세요."
+    assert _parse(text) == (False, [("Finance", "부채비율을 다시 설명하세요.")])
+
+
+def test_unknown_speaker():
+    text = "NEXT_SPEAKER: Macro\nINSTRUCTION: 금리 영향을 설명하세요."
+    assert _parse(text) == (False, [(None, "금리 영향을 설명하세요.")])
+
+
+def test_unparseable_output():
+    assert _parse("토론을 계속 진행하겠습니다.") == (False, [])
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,112 @@
+# tests/test_rate_limiter.py
+# 토큰 버킷 계산 확인 (API 호출 없음): python -m pytest tests/test_rate_limiter.py 또는 python -m tests.test_rate_limiter
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import patch
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import UpstageRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock, **kwargs):
+    with patch.object(rate_limiter.time, "time", clock):
+        return UpstageRateLimiter(**kwargs)
+
+
+def test_burst_then_refill():
+    clock = FakeClock()
+    limiter = _limiter(clock, requests_per_minute=60, burst=2)
+    with patch.object(rate_limiter.time, "time", clock):
+        assert limiter._try_acquire() == 0.0
+        assert limiter._try_acquire() == 0.0
+        # 버킷이 비었으므로 1개가 찰 때까지(60 RPM -> 1초) 기다려야 합니다.
+        assert abs(limiter._try_acquire() - 1.0) < 1e-6
+        clock.now += 1.0
+        assert limiter._try_acquire() == 0.0
+
+
+def test_token_budget_debt():
+    clock = FakeClock()
+    limiter = _limiter(clock, tokens_per_minute=600)
+    with patch.object(rate_limiter.time, "time", clock):
+        limiter.record_tokens(700)
+        # 잔고 -100 토큰 -> 분당 600 토큰 속도로 10초 후 0
+        assert abs(limiter._try_acquire() - 10.0) < 1e-6
+        clock.now += 10.0
+        assert limiter._try_acquire() == 0.0
+
+
+def test_block_for_cooldown():
+    clock = FakeClock()
+    limiter = _limiter(clock, requests_per_minute=600)
+    with patch.object(rate_limiter.time, "time", clock):
+        limiter.block_for(5)
+        assert abs(limiter._try_acquire() - 5.0) < 1e-6
+        assert abs(limiter.wait_estimate() - 5.0) < 1e-6
+
+
+def test_wait_estimate_caps_at_burst():
+    clock = FakeClock()
+    limiter = _limiter(clock, requests_per_minute=60, burst=2)
+    with patch.object(rate_limiter.time, "time", clock):
+        assert limiter.wait_estimate(2) == 0.0
+        limiter._try_acquire()
+        limiter._try_acquire()
+        # 버킷 크기(2)보다 많이 요청해도 버킷이 가득 찰 때까지만 기다립니다.
+        assert abs(limiter.wait_estimate(5) - 2.0) < 1e-6
+
+
+def test_disabled_by_default():
+    limiter = UpstageRateLimiter()
+    for _ in range(1000):
+        assert limiter._try_acquire() == 0.0
+
+
+def test_failed_non_blocking_acquire_is_not_counted():
+    clock = FakeClock()
+    limiter = _limiter(clock, requests_per_minute=60, burst=1)
+    with patch.object(rate_limiter.time, "time", clock):
+        assert limiter.acquire(blocking=False) is True
+        assert limiter.acquire(blocking=False) is False
+    stats = limiter.stats()
+    assert stats["acquired"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_file_state_async_paths_run_in_thread():
+    # 같은 상태 파일을 쓰는 두 리미터 = 두 워커
+    path = os.path.join(tempfile.mkdtemp(), "limiter.json")
+    worker_a = UpstageRateLimiter(requests_per_minute=60, burst=1, state_file=path)
+    worker_b = UpstageRateLimiter(requests_per_minute=60, burst=1, state_file=path)
+    offloaded = []
+
+    async def to_thread(func, *args):
+        offloaded.append(func.__name__)
+        return func(*args)
+
+    async def run():
+        await worker_a.ablock_for(30)
+        await worker_a.arecord_tokens(10)
+        return await worker_b.await_estimate(1)
+
+    with patch.object(rate_limiter.asyncio, "to_thread", to_thread):
+        wait = asyncio.run(run())
+    assert 29 < wait <= 30
+    assert offloaded == ["block_for", "record_tokens", "wait_estimate"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,191 @@
+# tests/test_retrieval_cache.py
+# 토론 단위 검색 캐시 키/버전/일괄 검색 확인 (API 호출 없음): python -m pytest tests/test_retrieval_cache.py 또는 python -m tests.test_retrieval_cache
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from app.repository.chroma_db import bump_collection_version
+from app.service.retrieval_cache import DebateRetrievalCache
+from app.service.knowledge_handoff import KnowledgeHandoff
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []   # aembed_queries 호출마다 받은 쿼리 리스트
+
+    async def aembed_queries(self, queries):
+        self.batches.append(list(queries))
+        return [[float(len(query)), 1.0] for query in queries]
+
+    def embed_queries(self, queries):
+        return [[1.0, 0.0] if "반도체" in query else [0.0, 1.0] for query in queries]
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] if "반도체" in text else [0.0, 1.0] for text in texts]
+
+
+class FakeVectorDB:
+    """Chroma 대신 카테고리별 문서 리스트를 들고 호출 횟수만 세는 가짜 벡터 DB"""
+
+    def __init__(self, name, docs_by_category):
+        self._collection = SimpleNamespace(name=name)
+        self.docs = {
+            category: [Document(page_content=text, metadata={"category": category}) for text in texts]
+            for category, texts in docs_by_category.items()
+        }
+        self.embeddings = FakeEmbeddings()
+        self.gets = 0
+        self.searches = 0
+
+    def _docs(self, search_filter):
+        return self.docs.get((search_filter or {}).get("category"), [])
+
+    def get(self, where=None, limit=None, include=None):
+        self.gets += 1
+        docs = self._docs(where)[:limit]
+        return {
+            "ids": [str(i) for i in range(len(docs))],
+            "documents": [doc.page_content for doc in docs],
+            "metadatas": [doc.metadata for doc in docs],
+        }
+
+    def similarity_search(self, query, k=4, filter=None):
+        self.searches += 1
+        return self._docs(filter)[:k]
+
+    async def asimilarity_search(self, query, k=4, filter=None):
+        await asyncio.sleep(0.01)   # 동시에 들어온 같은 검색이 겹치도록 잠깐 대기
+        return self.similarity_search(query, k=k, filter=filter)
+
+    async def asimilarity_search_by_vector(self, embedding, k=4, filter=None):
+        return self.similarity_search(None, k=k, filter=filter)
+
+
+def _db(name):
+    # news는 k(3)보다 많아 벡터 검색, chart는 1개라 메타데이터 조회로 끝납니다.
+    return FakeVectorDB(name, {"news": ["n1", "n2", "n3", "n4", "n5"], "chart": ["c1"]})
+
+
+NEWS = ("삼성전자 최신 이슈", "news", 3, {"category": "news"})
+CHART = ("삼성전자 기술적 분석", "chart", 3, {"category": "chart"})
+
+
+def test_hit_after_miss():
+    db = _db("test_hit_after_miss")
+    cache = DebateRetrievalCache(db)
+
+    first = cache.search(*NEWS)
+    second = cache.search(*NEWS)
+    assert first is second
+    assert db.searches == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # 쿼리나 k가 다르면 다른 검색입니다.
+    cache.search("다른 쿼리", "news", 3, {"category": "news"})
+    assert db.searches == 2
+
+
+def test_concurrent_searches_share_inflight():
+    db = _db("test_concurrent_searches_share_inflight")
+    cache = DebateRetrievalCache(db)
+
+    async def run():
+        return await asyncio.gather(*[cache.asearch(*NEWS) for _ in range(3)])
+
+    results = asyncio.run(run())
+    assert all(docs is results[0] for docs in results)
+    assert db.searches == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_version_bump_invalidates():
+    db = _db("test_version_bump_invalidates")
+    cache = DebateRetrievalCache(db)
+
+    cache.search(*NEWS)
+    bump_collection_version(db)   # 인제스터가 문서를 쓴 뒤 호출
+    cache.search(*NEWS)
+    assert db.searches == 2
+    assert cache.misses == 2
+
+
+def test_small_category_uses_metadata_fetch():
+    db = _db("test_small_category_uses_metadata_fetch")
+    cache = DebateRetrievalCache(db)
+
+    docs = cache.search(*CHART)
+    assert [doc.page_content for doc in docs] == ["c1"]
+    assert db.searches == 0
+    assert cache.direct_fetches == 1
+
+
+def test_awarm_batches_query_embeddings():
+    db = _db("test_awarm_batches_query_embeddings")
+    cache = DebateRetrievalCache(db)
+    other_news = ("삼성전자 투자 심리", "news", 3, {"category": "news"})
+
+    asyncio.run(cache.awarm([NEWS, NEWS, other_news, CHART]))
+    # 벡터 검색이 필요한 news 쿼리 2개만 한 번의 호출로 임베딩합니다.
+    assert db.embeddings.batches == [[NEWS[0], other_news[0]]]
+    assert cache.direct_fetches == 1
+    assert cache.stats()["entries"] == 3
+
+    # 이후 에이전트의 검색은 모두 캐시 적중입니다.
+    searches = db.searches
+    for request in (NEWS, other_news, CHART):
+        cache.search(*request)
+    assert db.searches == searches
+    assert cache.hits == 3
+
+
+def test_sync_search_ranks_handoff_docs():
+    # write-behind 적재 중: Chroma에는 아직 news 문서가 없고 handoff만 문서를 들고 있습니다.
+    db = FakeVectorDB("test_sync_search_ranks_handoff_docs", {})
+    texts = ["환율 뉴스", "금리 뉴스", "반도체 수출 뉴스", "유가 뉴스"]
+    handoff = KnowledgeHandoff(db, {"news": [Document(page_content=text) for text in texts]})
+    cache = DebateRetrievalCache(db, handoff=handoff)
+
+    docs = cache.search("반도체 업황", "news", 1, {"category": "news"})
+    assert [doc.page_content for doc in docs] == ["반도체 수출 뉴스"]
+    assert db.searches == 0 and db.gets == 0
+    assert cache.handoff_reads == 1
+
+
+def test_agents_share_one_common_search():
+    # 에이전트 모듈은 수집 도구(yfinance 등)까지 불러오므로 이 테스트에서만 가져옵니다.
+    from app.agents import base_agent
+    from app.agents.chart_agent import ChartAgent
+    from app.agents.finance_agent import FinanceAgent
+    from app.agents.news_agent import NewsAgent
+
+    db = FakeVectorDB("test_agents_share_one_common_search", {
+        "common": [f"d{i}" for i in range(10)],
+        "news": ["n1", "n2", "n3", "n4"], "chart": ["c1"], "finance": ["f1"],
+    })
+    cache = DebateRetrievalCache(db)
+    with patch.object(base_agent, "get_solar_model", lambda: None):   # LLM은 쓰지 않습니다.
+        agents = [cls(name, role, db, retrieval_cache=cache) for cls, name, role in (
+            (FinanceAgent, "재무 분석가", "Finance"), (NewsAgent, "뉴스 분석가", "News"), (ChartAgent, "차트 분석가", "Chart"),
+        )]
+
+    requests = [r for agent in agents for r in agent.retrieval_requests("삼성전자", "005930")]
+    common = {(query, k) for query, category, k, _ in requests if category == "common"}
+    assert common == {(agents[0]._common_query("삼성전자", "005930"), base_agent.BaseAgent.SHARED_COMMON_K)}
+
+    asyncio.run(cache.awarm(requests))
+    contexts = [asyncio.run(agent._aget_dual_context(
+        agent._search_query("삼성전자", "005930"), agent._common_query("삼성전자", "005930"))) for agent in agents]
+    # 공통(DART) 검색 1회 + news 벡터 검색 1회, 이후는 모두 캐시 적중
+    assert db.searches == 2
+    assert len({agent.context_cache["common"] for agent in agents}) == 1
+    assert all("d5" in context for context in contexts)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,78 @@
+# tests/test_ticker_index.py
+# 종목 색인(n-gram 부분 문자열 / 초성 검색) 확인 (네트워크 없음): python -m tests.test_ticker_index
+
+import pandas as pd
+
+from app.utils.ticker_utils import (
+    TickerIndex, TickerTable, _SubstringIndex, is_chosung_query, strip_suffixes, to_chosung,
+)
+
+
+def _index():
+    df = pd.DataFrame([
+        {"symbol": "005930", "name": "삼성전자", "market": "KOSPI"},
+        {"symbol": "005935", "name": "삼성전자우", "market": "KOSPI"},
+        {"symbol": "000660", "name": "SK하이닉스", "market": "KOSPI"},
+        {"symbol": "247540", "name": "에코프로비엠", "market": "KOSDAQ"},
+        {"symbol": "AAPL", "name": "Apple Inc", "market": "NASDAQ"},
+    ])
+    return TickerIndex(TickerTable.from_frame(df))
+
+
+def test_chosung_helpers():
+    assert to_chosung("삼성전자") == "ㅅㅅㅈㅈ"
+    assert to_chosung("SK하이닉스") == "SKㅎㅇㄴㅅ"
+    assert is_chosung_query("ㅅㅅㅈㅈ")
+    assert not is_chosung_query("삼성")
+    assert not is_chosung_query("")
+
+
+def test_strip_suffixes():
+    assert strip_suffixes("삼성전자는") == "삼성전자"
+    assert strip_suffixes("카카오주가") == "카카오"
+    # 조사만 남는 토큰은 그대로 둡니다.
+    assert strip_suffixes("는") == "는"
+
+
+def test_substring_index_returns_first_registered_match():
+    index = _SubstringIndex(["ABC", "XABCY", "", "ABD"])
+    assert index.find("ABC") == 0
+    assert index.find("BCY") == 1
+    assert index.find("B") == 0
+    assert index.find("ZZ") is None
+    assert index.find("") is None
+
+
+def test_lookup_exact_before_substring():
+    index = _index()
+    # '삼성전자'는 '삼성전자우'에도 포함되지만 완전 일치가 우선입니다.
+    assert index.lookup("삼성전자")["symbol"] == "005930"
+    assert index.lookup("005930")["symbol"] == "005930"
+    assert index.lookup("하이닉스")["symbol"] == "000660"
+    assert index.lookup("에코프로")["market"] == "KOSDAQ"
+    assert index.lookup("없는종목") is None
+
+
+def test_lookup_is_case_insensitive():
+    index = _index()
+    assert index.lookup("APPLE")["symbol"] == "AAPL"
+    assert index.exact("AAPL")["market"] == "NASDAQ"
+
+
+def test_chosung_lookup():
+    index = _index()
+    assert index.lookup("ㅅㅅㅈㅈ")["symbol"] == "005930"
+    assert index.lookup("ㅇㅋㅍㄹ")["symbol"] == "247540"
+
+
+def test_get_name():
+    index = _index()
+    assert index.get_name("005930") == "삼성전자"
+    assert index.get_name("MSFT") is None
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,53 @@
+# tests/test_ticker_resolver.py
+# LLM 앞단의 결정적 종목 식별 확인 (네트워크 없음): python -m tests.test_ticker_resolver
+
+from unittest.mock import patch
+from types import SimpleNamespace
+
+import pandas as pd
+
+from app.service import ticker_resolver
+from app.service.ticker_resolver import TickerPreResolver
+from app.utils.ticker_utils import TickerIndex, TickerTable
+
+
+def _manager():
+    df = pd.DataFrame([
+        {"symbol": "005930", "name": "삼성전자", "market": "KOSPI"},
+        {"symbol": "AAPL", "name": "Apple Inc", "market": "NASDAQ"},
+        {"symbol": "AI", "name": "C3.ai Inc", "market": "NYSE"},
+        {"symbol": "ON", "name": "ON Semiconductor", "market": "NASDAQ"},
+    ])
+    return SimpleNamespace(index=TickerIndex(TickerTable.from_frame(df)))
+
+
+def _resolve(user_input):
+    with patch.object(ticker_resolver, "ticker_manager", _manager()):
+        return TickerPreResolver().resolve(user_input)
+
+
+def test_whole_input_symbol():
+    assert _resolve("AAPL") == "AAPL"
+    assert _resolve("  aapl ") == "AAPL"
+
+
+def test_symbol_inside_sentence_goes_to_llm():
+    assert _resolve("AI 관련주 추천해줘") is None
+    assert _resolve("ON 어때") is None
+    assert _resolve("AAPL 어때") is None
+
+
+def test_codes_names_and_aliases():
+    assert _resolve("005930.KS 분석해줘") == "005930"
+    assert _resolve("삼성전자는 어때") == "005930"
+    assert _resolve("Apple Inc") == "AAPL"
+    assert _resolve("애플 전망") == "AAPL"
+    # 서로 다른 종목이 둘 이상이면 LLM에 맡깁니다.
+    assert _resolve("삼전 vs 애플") is None
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")